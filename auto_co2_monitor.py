@@ -6,69 +6,68 @@ MACアドレス事前指定なしで自動的にCO2デバイスを発見
 
 import asyncio
 import logging
-from datetime import datetime
+import time
 from typing import Dict, Set, Optional
-from bleak import BleakScanner
 from bleak.backends.device import BLEDevice
 from bleak.backends.scanner import AdvertisementData
 
 from co2logger.devices.real_co2_meter import RealCO2Meter
 from co2logger.devices.switchbot_co2 import SwitchBotCO2Sensor
-from co2logger import ConsoleExporter
+from co2logger import ConsoleExporter, create_filtered_scanner
 
 # ロギング設定
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# デバイスタイプの表示名（コールバック毎のdict再構築を回避）
+_DEVICE_TYPE_NAME = {
+    "real_co2_meter": "実際のCO2計",
+    "switchbot_co2": "SwitchBot CO2センサー",
+    "unknown_co2": "不明なCO2デバイス"
+}
+
 class AutoCO2Monitor:
     """CO2デバイス自動検出・監視クラス"""
     
     def __init__(self):
         self.exporter = ConsoleExporter(verbose=True)
         self.detected_co2_devices: Dict[str, str] = {}  # アドレス -> デバイスタイプ
-        self.device_last_update: Dict[str, datetime] = {}
+        self.device_last_update: Dict[str, float] = {}  # アドレス -> monotonic秒
+        self._wrappers: Dict[str, object] = {}  # アドレス -> デバイスラッパー（アドバタイズ毎の再生成を回避）
         self.update_interval = 30  # 30秒間隔
         self.discovery_mode = True
         self.discovery_timeout = 60  # 60秒間スキャンしてデバイス発見
         
     def should_update_device(self, device_address: str) -> bool:
         """デバイスの更新が必要かチェック"""
-        last_update = self.device_last_update.get(device_address)
-        if last_update is None:
-            return True
-        
-        elapsed = (datetime.now() - last_update).total_seconds()
-        return elapsed >= self.update_interval
+        last_update = self.device_last_update.get(device_address, float('-inf'))
+        return time.monotonic() - last_update >= self.update_interval
     
     def detect_co2_device_type(self, device: BLEDevice, advertisement_data: AdvertisementData) -> Optional[str]:
         """CO2デバイスのタイプを自動検出"""
         
+        # AdvertisementDataは常にmanufacturer_data属性を持つ（空の場合は{}）
+        mfr = advertisement_data.manufacturer_data
+
         # 1. 実際のCO2計（製造者ID: 2409）をチェック
         if RealCO2Meter.is_real_co2_meter(device, advertisement_data):
-            # CO2値が現実的な範囲かダブルチェック
-            if hasattr(advertisement_data, 'manufacturer_data'):
-                for manufacturer_id, data in advertisement_data.manufacturer_data.items():
-                    if manufacturer_id == 2409 and len(data) >= 16:
-                        try:
-                            import struct
-                            co2_ppm = struct.unpack('>H', data[13:15])[0]
-                            if 300 <= co2_ppm <= 5000:  # 現実的なCO2範囲
-                                return "real_co2_meter"
-                        except:
-                            pass
+            # CO2値が現実的な範囲かダブルチェック（キーは2409と分かっているため直接参照）
+            data = mfr.get(2409)
+            if data is not None and len(data) >= 16:
+                # 単一フィールドのu16ビッグエンディアンはシフト演算が最速
+                co2_ppm = (data[13] << 8) | data[14]
+                if 300 <= co2_ppm <= 5000:  # 現実的なCO2範囲
+                    return "real_co2_meter"
         
         # 2. SwitchBot CO2センサー（製造者ID: 76）をチェック
         if SwitchBotCO2Sensor.is_co2_sensor(device, advertisement_data):
             return "switchbot_co2"
         
         # 3. その他のCO2デバイス候補をチェック
-        if hasattr(advertisement_data, 'manufacturer_data'):
-            for manufacturer_id, data in advertisement_data.manufacturer_data.items():
-                # CO2関連と思われるデータパターンをチェック
-                if len(data) >= 8:
-                    # デバイス名にCO2が含まれる
-                    if device.name and 'co2' in device.name.lower():
-                        return "unknown_co2"
+        if mfr and device.name and 'co2' in device.name.lower():
+            # CO2関連と思われるデータパターンをチェック
+            if any(len(data) >= 8 for data in mfr.values()):
+                return "unknown_co2"
         
         return None
     
@@ -76,27 +75,28 @@ class AutoCO2Monitor:
         """CO2データを処理して表示"""
         try:
             co2_data = None
-            
-            if device_type == "real_co2_meter":
-                meter = RealCO2Meter(device)
-                co2_data = meter.create_sensor_data_from_advertisement(advertisement_data)
-            elif device_type == "switchbot_co2":
-                sensor = SwitchBotCO2Sensor(device)
-                co2_data = sensor.create_sensor_data_from_advertisement(advertisement_data)
+
+            wrapper = self._wrappers.get(device.address)
+            if wrapper is None:
+                if device_type == "real_co2_meter":
+                    wrapper = RealCO2Meter(device)
+                elif device_type == "switchbot_co2":
+                    wrapper = SwitchBotCO2Sensor(device)
+                if wrapper is not None:
+                    self._wrappers[device.address] = wrapper
+
+            if wrapper is not None:
+                co2_data = wrapper.create_sensor_data_from_advertisement(advertisement_data)
             
             if co2_data:
                 # 更新時刻記録
-                self.device_last_update[device.address] = datetime.now()
+                self.device_last_update[device.address] = time.monotonic()
                 
                 # データを出力
                 asyncio.create_task(self.exporter.export(co2_data))
                 
                 # 詳細ログ
-                device_type_name = {
-                    "real_co2_meter": "実際のCO2計",
-                    "switchbot_co2": "SwitchBot CO2センサー",
-                    "unknown_co2": "不明なCO2デバイス"
-                }.get(device_type, device_type)
+                device_type_name = _DEVICE_TYPE_NAME.get(device_type, device_type)
                 
                 logger.info(f"[{device_type_name}] {device.address}")
                 logger.info(f"  CO2: {co2_data.co2_ppm} ppm")
@@ -109,25 +109,29 @@ class AutoCO2Monitor:
     def detection_callback(self, device: BLEDevice, advertisement_data: AdvertisementData):
         """デバイス検出コールバック"""
         try:
+            # 事前フィルタ: CO2関連の製造者ID・デバイス名を持たないアドバタイズは即座に除外
+            mfr = getattr(advertisement_data, 'manufacturer_data', None) or {}
+            if 2409 not in mfr and 76 not in mfr and not (device.name and 'co2' in device.name.lower()):
+                return
+
             # CO2デバイスタイプを自動検出
             device_type = self.detect_co2_device_type(device, advertisement_data)
-            
+
             if device_type:
+                # アドレスはこの先のデバイス状態参照で繰り返し使うためローカルに保持
+                address = device.address
+
                 # 新しいCO2デバイスを発見
-                if device.address not in self.detected_co2_devices:
-                    self.detected_co2_devices[device.address] = device_type
-                    device_type_name = {
-                        "real_co2_meter": "実際のCO2計",
-                        "switchbot_co2": "SwitchBot CO2センサー",
-                        "unknown_co2": "不明なCO2デバイス"
-                    }.get(device_type, device_type)
-                    
+                if address not in self.detected_co2_devices:
+                    self.detected_co2_devices[address] = device_type
+                    device_type_name = _DEVICE_TYPE_NAME.get(device_type, device_type)
+
                     logger.info(f"🔍 新しいCO2デバイスを発見: {device_type_name}")
-                    logger.info(f"   アドレス: {device.address}")
+                    logger.info(f"   アドレス: {address}")
                     logger.info(f"   デバイス名: {device.name or '(名前なし)'}")
-                
+
                 # 更新間隔チェック
-                if self.should_update_device(device.address):
+                if self.should_update_device(address):
                     self.process_co2_data(device, advertisement_data, device_type)
                     
         except Exception as e:
@@ -138,7 +142,7 @@ class AutoCO2Monitor:
         logger.info("🔍 CO2デバイス自動発見を開始...")
         logger.info(f"発見タイムアウト: {self.discovery_timeout}秒")
         
-        scanner = BleakScanner(self.detection_callback)
+        scanner = create_filtered_scanner(self.detection_callback)
         await scanner.start()
         await asyncio.sleep(self.discovery_timeout)
         await scanner.stop()
@@ -146,11 +150,7 @@ class AutoCO2Monitor:
         if self.detected_co2_devices:
             logger.info(f"✅ {len(self.detected_co2_devices)}台のCO2デバイスを発見:")
             for address, device_type in self.detected_co2_devices.items():
-                device_type_name = {
-                    "real_co2_meter": "実際のCO2計",
-                    "switchbot_co2": "SwitchBot CO2センサー",
-                    "unknown_co2": "不明なCO2デバイス"
-                }.get(device_type, device_type)
+                device_type_name = _DEVICE_TYPE_NAME.get(device_type, device_type)
                 logger.info(f"  📍 {address} - {device_type_name}")
         else:
             logger.warning("⚠️  CO2デバイスが見つかりませんでした")
@@ -172,7 +172,7 @@ class AutoCO2Monitor:
         logger.info("Ctrl+C で終了")
         
         try:
-            scanner = BleakScanner(self.detection_callback)
+            scanner = create_filtered_scanner(self.detection_callback)
             await scanner.start()
             await asyncio.sleep(duration)
             await scanner.stop()
@@ -8,11 +8,10 @@ import asyncio
 import logging
 import signal
 from datetime import datetime, timezone
-from bleak import BleakScanner
 from bleak.backends.device import BLEDevice
 from bleak.backends.scanner import AdvertisementData
 
-from co2logger import SwitchBotCO2Sensor, ConsoleExporter
+from co2logger import SwitchBotCO2Sensor, ConsoleExporter, create_filtered_scanner
 
 # ロギング設定
 logging.basicConfig(
@@ -28,51 +27,91 @@ class CO2BroadcastMonitor:
         self.running = False
         self.exporter = ConsoleExporter(verbose=True)
         self.detected_sensors = {}  # アドレス -> SwitchBotCO2Sensor
-        
+        # アドバタイズ毎のTask生成を避けるための有界キュー（溢れたら破棄）
+        self._export_queue: asyncio.Queue = asyncio.Queue(maxsize=256)
+        # 解析済みペイロード（同一アドバタイズの再解析を回避）
+        self._seen_payloads: set = set()
+
     def detection_callback(self, device: BLEDevice, advertisement_data: AdvertisementData):
         """デバイス検出時のコールバック"""
         try:
-            # CO2センサーかどうかチェック
-            if SwitchBotCO2Sensor.is_co2_sensor(device, advertisement_data):
-                # 既知のセンサーでなければ作成
-                if device.address not in self.detected_sensors:
-                    logger.info(f"新しいCO2センサーを検出: {device.name} ({device.address})")
-                    self.detected_sensors[device.address] = SwitchBotCO2Sensor(device)
-                
-                # ブロードキャストデータからCO2データを取得
-                sensor = self.detected_sensors[device.address]
-                co2_data = sensor.create_sensor_data_from_advertisement(advertisement_data)
-                
-                if co2_data:
-                    # データを出力
-                    asyncio.create_task(self.exporter.export(co2_data))
-                    logger.info(f"CO2データ取得: {co2_data.co2_ppm} ppm, "
-                               f"{co2_data.temperature}°C, {co2_data.humidity}%")
-                else:
-                    logger.debug(f"CO2データの解析に失敗: {device.address}")
+            # 事前フィルタ: SwitchBotの製造者ID・関連デバイス名を持たないアドバタイズは即座に除外
+            mfr = getattr(advertisement_data, 'manufacturer_data', None) or {}
+            if 76 not in mfr:
+                name = (device.name or "").lower()
+                if "co2" not in name and "switchbot" not in name:
+                    return
+
+            # 同一ペイロードの再解析を回避（センサーは同じ値を毎秒何度も送ってくる）
+            payload = mfr.get(76)
+            if payload is not None:
+                seen_key = (device.address, bytes(payload))
+                if seen_key in self._seen_payloads:
+                    return
+                if len(self._seen_payloads) > 1024:
+                    self._seen_payloads.clear()
+                self._seen_payloads.add(seen_key)
+
+            # 既知センサーは分類をスキップして直接解析へ
+            # （分類→再解析の二重パスは初回検出時のみに限定）
+            sensor = self.detected_sensors.get(device.address)
+            if sensor is None:
+                if not SwitchBotCO2Sensor.is_co2_sensor(device, advertisement_data):
+                    return
+                logger.info(f"新しいCO2センサーを検出: {device.name} ({device.address})")
+                sensor = SwitchBotCO2Sensor(device)
+                self.detected_sensors[device.address] = sensor
+
+            # ブロードキャストデータからCO2データを取得
+            co2_data = sensor.create_sensor_data_from_advertisement(advertisement_data)
+
+            if co2_data:
+                # データをキューに投入（エクスポートは専用コンシューマが実施）
+                try:
+                    self._export_queue.put_nowait(co2_data)
+                except asyncio.QueueFull:
+                    logger.debug("エクスポートキューが満杯のためデータを破棄")
+                logger.info(f"CO2データ取得: {co2_data.co2_ppm} ppm, "
+                           f"{co2_data.temperature}°C, {co2_data.humidity}%")
+            else:
+                logger.debug(f"CO2データの解析に失敗: {device.address}")
         except Exception as e:
             logger.error(f"検出コールバックエラー: {e}")
     
+    async def _drain_export_queue(self):
+        """キューからデータを取り出してまとめてエクスポート"""
+        while True:
+            batch = [await self._export_queue.get()]
+            # 溜まっている分は1回のエクスポートにまとめる（最大32件）
+            while len(batch) < 32:
+                try:
+                    batch.append(self._export_queue.get_nowait())
+                except asyncio.QueueEmpty:
+                    break
+            await self.exporter.export(batch)
+
     async def start_monitoring(self):
         """監視を開始"""
         logger.info("CO2センサーのブロードキャスト監視を開始します...")
         logger.info("Ctrl+C で終了してください")
-        
+
         self.running = True
-        
+        drain_task = asyncio.create_task(self._drain_export_queue())
+
         try:
-            scanner = BleakScanner(self.detection_callback)
+            scanner = create_filtered_scanner(self.detection_callback)
             await scanner.start()
-            
+
             # 監視継続
             while self.running:
                 await asyncio.sleep(1)
-                
+
         except asyncio.CancelledError:
             logger.info("監視が中断されました")
         except Exception as e:
             logger.error(f"監視エラー: {e}")
         finally:
+            drain_task.cancel()
             try:
                 await scanner.stop()
             except:
@@ -2,7 +2,7 @@
 SwitchBot CO2センサー Bluetoothデータリーダー
 """
 from .models.sensor_data import CO2SensorData, TemperatureData, HumidityData
-from .core.bluetooth_device import BluetoothDeviceBase, DeviceScanner
+from .core.bluetooth_device import BluetoothDeviceBase, DeviceScanner, create_filtered_scanner
 from .devices.switchbot_co2 import SwitchBotCO2Sensor
 from .exporters.base import DataExporterBase
 from .exporters.console import ConsoleExporter
@@ -16,6 +16,7 @@ __all__ = [
     "HumidityData",
     "BluetoothDeviceBase",
     "DeviceScanner",
+    "create_filtered_scanner",
     "SwitchBotCO2Sensor",
     "DataExporterBase",
     "ConsoleExporter",
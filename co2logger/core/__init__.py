@@ -1,6 +1,6 @@
 """
 Core package for CO2 logger Bluetooth communication
 """
-from .bluetooth_device import BluetoothDeviceBase, DeviceScanner
+from .bluetooth_device import BluetoothDeviceBase, DeviceScanner, create_filtered_scanner
 
-__all__ = ["BluetoothDeviceBase", "DeviceScanner"]
\ No newline at end of file
+__all__ = ["BluetoothDeviceBase", "DeviceScanner", "create_filtered_scanner"]
\ No newline at end of file
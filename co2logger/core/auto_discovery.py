@@ -6,15 +6,22 @@ CO2デバイス自動検出機能
 import asyncio
 import logging
 from typing import List, Dict, Optional, Tuple
-from bleak import BleakScanner
 from bleak.backends.device import BLEDevice
 from bleak.backends.scanner import AdvertisementData
 
+from .bluetooth_device import create_filtered_scanner
 from ..devices.real_co2_meter import RealCO2Meter
 from ..devices.switchbot_co2 import SwitchBotCO2Sensor
 
 logger = logging.getLogger(__name__)
 
+# デバイスタイプの表示名（コールバック毎のdict再構築を回避）
+_DEVICE_TYPE_NAME = {
+    "real_co2_meter": "実際のCO2計",
+    "switchbot_co2": "SwitchBot CO2センサー",
+    "generic_co2": "汎用CO2デバイス"
+}
+
 
 class CO2DeviceDiscovery:
     """CO2デバイス自動検出クラス"""
@@ -27,17 +34,13 @@ class CO2DeviceDiscovery:
         
         # 実際のCO2計をチェック
         if RealCO2Meter.is_real_co2_meter(device, advertisement_data):
-            # 追加検証: CO2値が現実的な範囲か
-            if hasattr(advertisement_data, 'manufacturer_data'):
-                for manufacturer_id, data in advertisement_data.manufacturer_data.items():
-                    if manufacturer_id == 2409 and len(data) >= 16:
-                        try:
-                            import struct
-                            co2_ppm = struct.unpack('>H', data[13:15])[0]
-                            if 300 <= co2_ppm <= 5000:
-                                return "real_co2_meter"
-                        except:
-                            pass
+            # 追加検証: CO2値が現実的な範囲か（キーは2409と分かっているため直接参照）
+            data = advertisement_data.manufacturer_data.get(2409)
+            if data is not None and len(data) >= 16:
+                # 単一フィールドのu16ビッグエンディアンはシフト演算が最速
+                co2_ppm = (data[13] << 8) | data[14]
+                if 300 <= co2_ppm <= 5000:
+                    return "real_co2_meter"
         
         # SwitchBot CO2センサーをチェック
         if SwitchBotCO2Sensor.is_co2_sensor(device, advertisement_data):
@@ -51,16 +54,17 @@ class CO2DeviceDiscovery:
     
     def detection_callback(self, device: BLEDevice, advertisement_data: AdvertisementData):
         """デバイス検出コールバック"""
+        # 事前フィルタ: CO2関連の製造者ID・デバイス名を持たないアドバタイズは即座に除外
+        mfr = getattr(advertisement_data, 'manufacturer_data', None) or {}
+        if 2409 not in mfr and 76 not in mfr and not (device.name and 'co2' in device.name.lower()):
+            return
+
         device_type = self.detect_co2_device_type(device, advertisement_data)
         
         if device_type and device.address not in self.discovered_devices:
             self.discovered_devices[device.address] = (device, device_type)
-            device_type_name = {
-                "real_co2_meter": "実際のCO2計",
-                "switchbot_co2": "SwitchBot CO2センサー",
-                "generic_co2": "汎用CO2デバイス"
-            }.get(device_type, device_type)
-            
+            device_type_name = _DEVICE_TYPE_NAME.get(device_type, device_type)
+
             logger.info(f"CO2デバイス発見: {device_type_name} ({device.address})")
     
     async def discover_co2_devices(self, scan_time: float = 60.0) -> List[Tuple[BLEDevice, str]]:
@@ -78,7 +82,7 @@ class CO2DeviceDiscovery:
         self.discovered_devices.clear()
         
         try:
-            scanner = BleakScanner(self.detection_callback)
+            scanner = create_filtered_scanner(self.detection_callback)
             await scanner.start()
             await asyncio.sleep(scan_time)
             await scanner.stop()
@@ -116,11 +120,7 @@ class CO2DeviceDiscovery:
         devices.sort(key=lambda x: priority.get(x[1], 999))
         
         best_device, device_type = devices[0]
-        device_type_name = {
-            "real_co2_meter": "実際のCO2計",
-            "switchbot_co2": "SwitchBot CO2センサー",
-            "generic_co2": "汎用CO2デバイス"
-        }.get(device_type, device_type)
+        device_type_name = _DEVICE_TYPE_NAME.get(device_type, device_type)
         
         logger.info(f"最適なCO2デバイスを選択: {device_type_name} ({best_device.address})")
         
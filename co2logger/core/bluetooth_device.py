@@ -2,23 +2,118 @@
 Base classes for Bluetooth device communication
 """
 import asyncio
+import json
 import logging
-from typing import Optional, List, Callable, Tuple, Dict, Any
-from bleak import BleakScanner, BleakClient
+import re
+from collections import deque
+from pathlib import Path
+from typing import Optional, List, Callable, Tuple, Dict, Any, Union
+from bleak import BleakScanner, BleakClient, BleakError
 from bleak.backends.device import BLEDevice
 from bleak.backends.scanner import AdvertisementData
 
 logger = logging.getLogger(__name__)
 
+# CO2関連デバイスの製造者ID（実CO2計: 2409, SwitchBot: 76）
+CO2_MANUFACTURER_IDS = (2409, 76)
+
+# デバイス名照合用（name.lower()の文字列生成を避け、C実装の検索で判定）
+_SWITCHBOT_RE = re.compile(r"switchbot", re.IGNORECASE)
+
+# 発見済みGATTテーブルの保存先（再接続時のウォームスタート用）
+_GATT_CACHE_DIR = Path.home() / ".cache" / "co2logger"
+
+# SwitchBotのアドバタイズに使われるサービスUUID（128bit完全形）
+SWITCHBOT_SERVICE_UUID = "0000fee7-0000-1000-8000-00805f9b34fb"
+
+# SwitchBotサービスデータのキー候補（短縮形・大文字・128bit完全形）
+# ループ内でuuid.lower()を呼ばずに直接dict参照するための定数
+_FEE7_KEYS = ("fee7", "FEE7", SWITCHBOT_SERVICE_UUID)
+
+
+class _PassiveFallbackScanner:
+    """パッシブスキャン開始に失敗したらアクティブスキャンへ切り替えるラッパー
+
+    BlueZのアドバタイズメントモニタ登録（RegisterMonitor）はスキャナの
+    構築時ではなくstart()時に行われ、--experimental無しのBlueZでは
+    そこでBleakErrorになる。そのためフォールバックは開始時に判断する。
+    """
+
+    __slots__ = ("_scanner", "_detection_callback")
+
+    def __init__(self, passive_scanner: BleakScanner, detection_callback: Callable):
+        self._scanner = passive_scanner
+        self._detection_callback = detection_callback
+
+    async def start(self):
+        """スキャンを開始（パッシブ不可なら通常スキャンで開始し直す）"""
+        try:
+            await self._scanner.start()
+        except BleakError as e:
+            logger.info(f"OSレベルフィルタを開始できないため通常スキャンを使用: {e}")
+            self._scanner = BleakScanner(self._detection_callback)
+            await self._scanner.start()
+
+    async def stop(self):
+        """スキャンを停止"""
+        await self._scanner.stop()
+
+
+def create_filtered_scanner(detection_callback: Callable,
+                            manufacturer_ids: Tuple[int, ...] = CO2_MANUFACTURER_IDS
+                            ) -> Union[BleakScanner, _PassiveFallbackScanner]:
+    """製造者IDフィルタ付きのスキャナを作成
+
+    BlueZバックエンドではパッシブスキャン+アドバタイズメントモニタを使い、
+    指定製造者IDのパケットのみをPython側コールバックに渡す。
+    フィルタ未対応のバックエンドでは通常のアクティブスキャンに
+    フォールバックする（構築時・開始時のどちらで失敗しても切り替わる）。
+
+    Args:
+        detection_callback: デバイス検出時のコールバック
+        manufacturer_ids: 通過させる製造者IDのタプル
+
+    Returns:
+        start()/stop()を持つスキャナインスタンス
+    """
+    try:
+        try:
+            from bleak.args.bluez import BlueZScannerArgs, OrPattern
+        except ImportError:
+            from bleak.backends.bluezdbus.scanner import BlueZScannerArgs
+            from bleak.backends.bluezdbus.advertisement_monitor import OrPattern
+        from bleak.assigned_numbers import AdvertisementDataType
+
+        patterns = [
+            OrPattern(0, AdvertisementDataType.MANUFACTURER_SPECIFIC_DATA,
+                      manufacturer_id.to_bytes(2, 'little'))
+            for manufacturer_id in manufacturer_ids
+        ]
+        passive_scanner = BleakScanner(
+            detection_callback,
+            scanning_mode="passive",
+            bluez=BlueZScannerArgs(or_patterns=patterns),
+        )
+        return _PassiveFallbackScanner(passive_scanner, detection_callback)
+    except Exception as e:
+        logger.debug(f"OSレベルフィルタ未対応のため通常スキャンを使用: {e}")
+        return BleakScanner(detection_callback)
+
 
 class BluetoothDeviceBase:
     """Base class for Bluetooth device communication"""
-    
+
+    # 固定属性のみなので__dict__を持たせない（インスタンスのメモリ削減と
+    # 属性アクセスの高速化。センサー毎にインスタンスが増えるため効果がある）
+    __slots__ = ("ble_device", "client", "_connection_timeout", "_char_cache")
+
     def __init__(self, ble_device: BLEDevice):
         """Initialize with BLE device"""
         self.ble_device = ble_device
         self.client: Optional[BleakClient] = None
-        self._connection_timeout = 10.0
+        self._connection_timeout = 5.0
+        # UUID -> GATT特性オブジェクト（読み書き毎のUUID解決を省くキャッシュ）
+        self._char_cache: Dict[str, Any] = {}
         
     @property
     def is_connected(self) -> bool:
@@ -44,11 +139,14 @@ class BluetoothDeviceBase:
         
         try:
             logger.info(f"Connecting to {self.device_name} ({self.device_address})")
-            self.client = BleakClient(self.ble_device.address)
+            # BLEDeviceを直接渡すことで、スキャン結果を再利用した高速な接続経路を使う
+            # （アドレス文字列渡しはバックエンドによっては再解決が走り遅い）
+            self.client = BleakClient(self.ble_device)
             await asyncio.wait_for(self.client.connect(), timeout=timeout)
             
             if self.client.is_connected:
                 logger.info(f"Successfully connected to {self.device_name}")
+                self._populate_char_cache()
                 return True
             else:
                 logger.error(f"Failed to connect to {self.device_name}")
@@ -68,17 +166,84 @@ class BluetoothDeviceBase:
                 logger.info(f"Disconnected from {self.device_name}")
             except Exception as e:
                 logger.error(f"Disconnect error for {self.device_name}: {e}")
-        
+
         self.client = None
+        self._char_cache.clear()
     
+    def _populate_char_cache(self):
+        """接続済みクライアントのGATT特性をUUIDで引けるようキャッシュ
+
+        bleakは特性オブジェクトを直接受け取れるため、毎回のUUID→ハンドル
+        解決（全サービス線形探索）を接続時の1回に集約できる。
+        """
+        self._char_cache.clear()
+        try:
+            for service in self.client.services:
+                for char in service.characteristics:
+                    self._char_cache[char.uuid] = char
+        except Exception as e:
+            logger.debug(f"GATT特性キャッシュを構築できませんでした: {e}")
+            return
+        self._save_gatt_cache()
+
+    def _gatt_cache_path(self) -> Path:
+        """このデバイスのGATTテーブル保存先パス"""
+        address = self.device_address.replace(":", "").lower()
+        return _GATT_CACHE_DIR / f"gatt_{address}.json"
+
+    def _save_gatt_cache(self):
+        """発見したGATTテーブルをディスクに保存（ベストエフォート）
+
+        bleakには発見結果を次回接続に注入する公開APIがないため、
+        このファイルは既知デバイスの特性一覧の記録として機能する
+        （BlueZ自体はGATTデータベースをOS側でキャッシュする）。
+        """
+        if not self._char_cache:
+            return
+        try:
+            table = {
+                uuid: {
+                    "handle": getattr(char, "handle", None),
+                    "properties": list(getattr(char, "properties", []) or []),
+                }
+                for uuid, char in self._char_cache.items()
+            }
+            self._gatt_cache_path().parent.mkdir(parents=True, exist_ok=True)
+            self._gatt_cache_path().write_text(json.dumps(table))
+        except Exception as e:
+            logger.debug(f"GATTキャッシュを保存できませんでした: {e}")
+
+    def load_cached_gatt_table(self) -> Optional[Dict[str, Any]]:
+        """前回接続時に保存したGATTテーブルを読み込む
+
+        接続前に既知デバイスの特性UUID・プロパティを参照したい場合に使う。
+
+        Returns:
+            UUID -> {handle, properties} の辞書、未保存ならNone
+        """
+        try:
+            return json.loads(self._gatt_cache_path().read_text())
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.debug(f"GATTキャッシュを読み込めませんでした: {e}")
+            return None
+
+    def _resolve_characteristic(self, characteristic_uuid: str):
+        """キャッシュ済み特性オブジェクトを返す（未登録ならUUIDのまま）"""
+        return self._char_cache.get(characteristic_uuid, characteristic_uuid)
+
     async def read_characteristic(self, characteristic_uuid: str) -> bytes:
         """Read data from a characteristic"""
-        if not self.is_connected:
+        # プロパティ経由を避け、ローカル変数で接続チェック（GATT操作毎の定型コスト削減）
+        client = self.client
+        if client is None or not client.is_connected:
             raise RuntimeError("Device not connected")
-        
+
         try:
-            data = await self.client.read_gatt_char(characteristic_uuid)
-            logger.debug(f"Read {len(data)} bytes from {characteristic_uuid}")
+            data = await client.read_gatt_char(self._resolve_characteristic(characteristic_uuid))
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"Read {len(data)} bytes from {characteristic_uuid}")
             return data
         except Exception as e:
             logger.error(f"Read error from {characteristic_uuid}: {e}")
@@ -86,23 +251,26 @@ class BluetoothDeviceBase:
     
     async def write_characteristic(self, characteristic_uuid: str, data: bytes, response: bool = True):
         """Write data to a characteristic"""
-        if not self.is_connected:
+        client = self.client
+        if client is None or not client.is_connected:
             raise RuntimeError("Device not connected")
-        
+
         try:
-            await self.client.write_gatt_char(characteristic_uuid, data, response=response)
-            logger.debug(f"Wrote {len(data)} bytes to {characteristic_uuid}")
+            await client.write_gatt_char(self._resolve_characteristic(characteristic_uuid), data, response=response)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"Wrote {len(data)} bytes to {characteristic_uuid}")
         except Exception as e:
             logger.error(f"Write error to {characteristic_uuid}: {e}")
             raise
     
     async def start_notify(self, characteristic_uuid: str, callback: Callable):
         """Start notifications for a characteristic"""
-        if not self.is_connected:
+        client = self.client
+        if client is None or not client.is_connected:
             raise RuntimeError("Device not connected")
-        
+
         try:
-            await self.client.start_notify(characteristic_uuid, callback)
+            await client.start_notify(self._resolve_characteristic(characteristic_uuid), callback)
             logger.debug(f"Started notifications for {characteristic_uuid}")
         except Exception as e:
             logger.error(f"Notify start error for {characteristic_uuid}: {e}")
@@ -110,11 +278,12 @@ class BluetoothDeviceBase:
     
     async def stop_notify(self, characteristic_uuid: str):
         """Stop notifications for a characteristic"""
-        if not self.is_connected:
+        client = self.client
+        if client is None or not client.is_connected:
             raise RuntimeError("Device not connected")
-        
+
         try:
-            await self.client.stop_notify(characteristic_uuid)
+            await client.stop_notify(self._resolve_characteristic(characteristic_uuid))
             logger.debug(f"Stopped notifications for {characteristic_uuid}")
         except Exception as e:
             logger.error(f"Notify stop error for {characteristic_uuid}: {e}")
@@ -124,13 +293,19 @@ class BluetoothDeviceBase:
 class DeviceScanner:
     """Scanner for Bluetooth devices"""
     
+    # バッチフラッシュの間隔（秒）と1バッチの上限
+    FLUSH_INTERVAL = 0.1
+    BATCH_MAXLEN = 64
+
     def __init__(self):
         """Initialize scanner"""
         self._user_callback: Optional[Callable] = None
         self._discovered_devices: List[Tuple[BLEDevice, AdvertisementData]] = []
-    
-    def set_detection_callback(self, callback: Callable[[BLEDevice, AdvertisementData], None]):
-        """Set callback for device detection"""
+        # コールバック毎のユーザー処理を避けるための保留バッファ
+        self._pending: deque = deque(maxlen=self.BATCH_MAXLEN)
+
+    def set_detection_callback(self, callback: Callable[[List[Tuple[BLEDevice, AdvertisementData]]], None]):
+        """Set callback invoked with batches of detected devices"""
         self._user_callback = callback
     
     async def scan_for_devices(self, scan_time: float = 10.0) -> List[BLEDevice]:
@@ -148,10 +323,20 @@ class DeviceScanner:
     async def scan_for_switchbot_devices(self, scan_time: float = 10.0) -> List[BLEDevice]:
         """Scan specifically for SwitchBot devices"""
         logger.info(f"Scanning for SwitchBot devices for {scan_time} seconds...")
-        
-        devices = await self.scan_for_devices(scan_time)
+
+        # サービスUUIDフィルタをOS/BLEスタック側に渡し、対象外デバイスの転送自体を減らす
+        try:
+            devices = await BleakScanner.discover(
+                timeout=scan_time,
+                service_uuids=[SWITCHBOT_SERVICE_UUID]
+            )
+        except Exception as e:
+            logger.error(f"Scan error: {e}")
+            return []
+
+        # フィルタ未対応バックエンドに備えてPython側でも確認
         switchbot_devices = []
-        
+
         for device in devices:
             if self.is_switchbot_device(device, None):
                 switchbot_devices.append(device)
@@ -162,7 +347,7 @@ class DeviceScanner:
     def is_switchbot_device(self, device: BLEDevice, advertisement_data: Optional[AdvertisementData]) -> bool:
         """Check if device is a SwitchBot device"""
         # Check by device name
-        if device.name and "switchbot" in device.name.lower():
+        if device.name and _SWITCHBOT_RE.search(device.name):
             return True
         
         # Check by manufacturer data (実際のデータに基づく)
@@ -179,60 +364,81 @@ class DeviceScanner:
         # Check by service data
         if advertisement_data and hasattr(advertisement_data, 'service_data') and advertisement_data.service_data:
             # SwitchBot devices advertise on service UUID "fee7"
-            for uuid, data in advertisement_data.service_data.items():
-                if isinstance(uuid, str) and uuid.lower() == "fee7" and len(data) > 0:
+            service_data = advertisement_data.service_data
+            for key in _FEE7_KEYS:
+                data = service_data.get(key)
+                if data:
                     return True
-        
+
         return False
     
     def _detection_callback(self, device: BLEDevice, advertisement_data: AdvertisementData) -> bool:
-        """Internal detection callback"""
+        """Internal detection callback (buffers only, no user work inline)"""
         if self.is_switchbot_device(device, advertisement_data):
-            if self._user_callback:
-                self._user_callback(device, advertisement_data)
+            self._pending.append((device, advertisement_data))
             self._discovered_devices.append((device, advertisement_data))
             return True
         return False
-    
+
+    def _drain_pending(self):
+        """保留中のアドバタイズをまとめてユーザーコールバックに渡す"""
+        if self._pending and self._user_callback:
+            batch = list(self._pending)
+            self._pending.clear()
+            self._user_callback(batch)
+
+    async def _flush_loop(self):
+        """一定間隔で保留バッファをフラッシュ"""
+        while True:
+            await asyncio.sleep(self.FLUSH_INTERVAL)
+            self._drain_pending()
+
     async def scan_with_callback(self, scan_time: float = 10.0) -> List[Tuple[BLEDevice, AdvertisementData]]:
         """Scan for devices using callback detection"""
         logger.info(f"Scanning with callback for {scan_time} seconds...")
         self._discovered_devices.clear()
-        
-        scanner = BleakScanner(detection_callback=self._detection_callback)
-        await scanner.start()
-        await asyncio.sleep(scan_time)
-        await scanner.stop()
-        
+        self._pending.clear()
+
+        flusher = asyncio.create_task(self._flush_loop())
+        try:
+            scanner = BleakScanner(detection_callback=self._detection_callback)
+            await scanner.start()
+            await asyncio.sleep(scan_time)
+            await scanner.stop()
+        finally:
+            flusher.cancel()
+            # 停止後に残ったバッチを最終フラッシュ
+            self._drain_pending()
+
         logger.info(f"Found {len(self._discovered_devices)} SwitchBot devices via callback")
         return self._discovered_devices.copy()
     
     def filter_devices_by_type(self, devices: List[Tuple[BLEDevice, Dict[str, Any]]], device_type: int) -> List[Tuple[BLEDevice, Dict[str, Any]]]:
         """Filter devices by their device type"""
-        filtered = []
-        for device, data in devices:
-            if data.get("device_type") == device_type:
-                filtered.append((device, data))
-        return filtered
+        # 内包表記はC実装のLIST_APPENDで動き、append呼び出しより速い
+        return [entry for entry in devices if entry[1].get("device_type") == device_type]
     
     def parse_service_data(self, service_data: Dict[str, bytes]) -> Dict[str, Any]:
         """Parse SwitchBot service data"""
         parsed = {}
-        
-        for uuid, data in service_data.items():
-            if uuid.lower() == "fee7" and len(data) > 0:
+
+        for key in _FEE7_KEYS:
+            data = service_data.get(key)
+            if data:
                 # Parse SwitchBot service data format
                 device_type = data[0] & 0x7F  # Lower 7 bits
                 is_encrypted = (data[0] & 0x80) != 0  # Bit 7
-                
+
                 parsed.update({
                     "device_type": device_type,
                     "is_encrypted": is_encrypted,
                     "raw_service_data": data.hex()
                 })
-                
+
                 # Parse additional data based on device type
                 if len(data) > 1:
-                    parsed["additional_data"] = data[1:].hex()
-        
+                    # memoryviewのスライスはコピーを作らない
+                    parsed["additional_data"] = memoryview(data)[1:].hex()
+                break
+
         return parsed
\ No newline at end of file
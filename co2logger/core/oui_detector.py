@@ -4,12 +4,19 @@ Bluetooth OUI (Organizationally Unique Identifier) ベースのCO2デバイス
 """
 
 import logging
+import re
 from typing import Dict, List, Optional, Set
 from bleak.backends.device import BLEDevice
 from bleak.backends.scanner import AdvertisementData
 
 logger = logging.getLogger(__name__)
 
+# 16進小文字のみを大文字化する変換テーブル（upper()より分岐が少なくdict参照1回）
+_HEX_UPPER = str.maketrans('abcdef', 'ABCDEF')
+
+# デバイス名照合用（name.lower()の文字列生成を避ける）
+_CO2_RE = re.compile(r"co2", re.IGNORECASE)
+
 
 class OUIDatabase:
     """Bluetooth OUI データベース"""
@@ -32,8 +39,8 @@ class OUIDatabase:
         # 将来、新しい確実なCO2専用メーカーが見つかったら追加
     }
     
-    # 確実にCO2デバイスではないOUI（除外リスト）
-    EXCLUDED_OUIS = {
+    # 確実にCO2デバイスではないOUI（除外リスト、読み取り専用）
+    EXCLUDED_OUIS = frozenset({
         "00:00:00",  # 無効なOUI
         "FF:FF:FF",  # ブロードキャスト
         # スマートフォンなどの一般的なOUI
@@ -46,12 +53,12 @@ class OUIDatabase:
         "4A:ED:3F",  # SwitchBot（カーテン、プラグ等含む）
         "69:FB:B8",  # SwitchBot（その他デバイス）
         # 他の非CO2デバイス
-    }
+    })
     
     @classmethod
     def extract_oui(cls, mac_address: str) -> str:
         """MACアドレスからOUIを抽出"""
-        return mac_address[:8].upper()
+        return mac_address[:8].translate(_HEX_UPPER)
     
     @classmethod
     def is_known_co2_oui(cls, mac_address: str) -> bool:
@@ -86,33 +93,56 @@ class OUIBasedCO2Detector:
     def __init__(self):
         self.detected_ouis: Set[str] = set()
         self.unknown_ouis: Set[str] = set()
-        
+        # (アドレス, 製造者IDタプル) -> 判定結果（同一デバイスの再解析を回避）
+        self._verdict_cache: Dict[tuple, bool] = {}
+
     def analyze_device_by_oui(self, device: BLEDevice, advertisement_data: AdvertisementData) -> Dict:
         """OUIベースでデバイスを解析"""
         mac_address = device.address
+        # OUIの抽出・照合は1回だけ行い、結果を使い回す
         oui = OUIDatabase.extract_oui(mac_address)
-        
+        oui_info = OUIDatabase.CO2_DEVICE_OUIS.get(oui)
+        is_known_co2 = oui_info is not None
+        is_excluded = oui in OUIDatabase.EXCLUDED_OUIS
+
         analysis = {
             "mac_address": mac_address,
             "oui": oui,
-            "is_known_co2": OUIDatabase.is_known_co2_oui(mac_address),
-            "is_excluded": OUIDatabase.is_excluded_oui(mac_address),
-            "oui_info": OUIDatabase.get_oui_info(mac_address),
-            "confidence": OUIDatabase.get_confidence_level(mac_address),
+            "is_known_co2": is_known_co2,
+            "is_excluded": is_excluded,
+            "oui_info": oui_info,
+            "confidence": oui_info.get("confidence", "unknown") if is_known_co2 else "unknown",
             "device_name": device.name,
             "rssi": advertisement_data.rssi if advertisement_data else None
         }
-        
-        # 統計収集
-        if analysis["is_known_co2"]:
+
+        # 統計収集（dict再参照せずローカルの判定結果を使う）
+        if is_known_co2:
             self.detected_ouis.add(oui)
-        elif not analysis["is_excluded"]:
+        elif not is_excluded:
             self.unknown_ouis.add(oui)
-        
+
         return analysis
     
     def is_likely_co2_device(self, device: BLEDevice, advertisement_data: AdvertisementData) -> bool:
         """CO2デバイスの可能性が高いかチェック"""
+        # 同じデバイスは広告間隔毎に何度も届くため、判定結果をキャッシュする
+        # 製造者IDの組が変わった場合は再評価する
+        mfr = getattr(advertisement_data, 'manufacturer_data', None) or {}
+        cache_key = (device.address, tuple(mfr))
+        verdict = self._verdict_cache.get(cache_key)
+        if verdict is not None:
+            return verdict
+
+        verdict = self._evaluate_co2_device(device, advertisement_data)
+
+        if len(self._verdict_cache) > 512:
+            self._verdict_cache.clear()
+        self._verdict_cache[cache_key] = verdict
+        return verdict
+
+    def _evaluate_co2_device(self, device: BLEDevice, advertisement_data: AdvertisementData) -> bool:
+        """CO2デバイス判定の本体（キャッシュミス時のみ実行）"""
         analysis = self.analyze_device_by_oui(device, advertisement_data)
         
         # 確実に除外
@@ -125,20 +155,22 @@ class OUIBasedCO2Detector:
             return True
         
         # 追加検証: 製造者データとOUIの組み合わせ
-        if hasattr(advertisement_data, 'manufacturer_data') and advertisement_data.manufacturer_data:
-            for manufacturer_id, data in advertisement_data.manufacturer_data.items():
-                # 実際のCO2計: OUI B0:E9:FE + 製造者ID 2409
-                if analysis["oui"] == "B0:E9:FE" and manufacturer_id == 2409:
-                    logger.info(f"OUI+製造者IDでCO2計確認: {device.address}")
+        # 対象IDは2409と76だけなので、全エントリを走査せず直接参照する
+        md = advertisement_data.manufacturer_data if advertisement_data else None
+        if md:
+            # 実際のCO2計: OUI B0:E9:FE + 製造者ID 2409
+            if analysis["oui"] == "B0:E9:FE" and 2409 in md:
+                logger.info(f"OUI+製造者IDでCO2計確認: {device.address}")
+                return True
+
+            # SwitchBot: OUI + 製造者ID 76 + CO2データパターン
+            data = md.get(76)
+            if data is not None and len(data) >= 8:
+                device_type = data[0] & 0x7F
+                if device_type == 0x10:  # CO2センサータイプ
+                    logger.info(f"SwitchBot CO2センサー確認: {device.address}")
                     return True
-                
-                # SwitchBot: OUI + 製造者ID 76 + CO2データパターン
-                if manufacturer_id == 76 and len(data) >= 8:
-                    device_type = data[0] & 0x7F
-                    if device_type == 0x10:  # CO2センサータイプ
-                        logger.info(f"SwitchBot CO2センサー確認: {device.address}")
-                        return True
-        
+
         return False
     
     def get_detection_statistics(self) -> Dict:
@@ -162,23 +194,24 @@ class OUIBasedCO2Detector:
         suggestions = []
         
         # デバイス名にCO2が含まれる
-        if device.name and 'co2' in device.name.lower():
+        if device.name and _CO2_RE.search(device.name):
             suggestions.append("device_name_contains_co2")
         
         # 製造者データのパターン
-        if hasattr(advertisement_data, 'manufacturer_data') and advertisement_data.manufacturer_data:
-            for manufacturer_id, data in advertisement_data.manufacturer_data.items():
+        md = advertisement_data.manufacturer_data if advertisement_data else None
+        if md:
+            for manufacturer_id, data in md.items():
                 if len(data) >= 8:
                     # CO2らしいデータパターン
                     suggestions.append(f"manufacturer_data_pattern_{manufacturer_id}")
-        
+
         if suggestions:
             return {
                 "oui": analysis["oui"],
                 "mac_address": device.address,
                 "device_name": device.name,
                 "suggestions": suggestions,
-                "manufacturer_data_info": getattr(advertisement_data, 'manufacturer_data', {})
+                "manufacturer_data_info": md or {}
             }
         
         return None
\ No newline at end of file
@@ -3,7 +3,6 @@
 実際のCO2計 (OUI: B0:E9:FE, 製造者ID: 2409) 専用クラス
 """
 
-import struct
 import logging
 from datetime import datetime, timezone
 from typing import Optional, Dict, Any
@@ -21,6 +20,8 @@ class RealCO2Meter:
     # 実際のCO2計の識別情報
     MANUFACTURER_ID = 2409
     SERVICE_UUID = "0000fd3d-0000-1000-8000-00805f9b34fb"
+    # bleakのservice_dataキーは小文字の正規形なので、照合用を一度だけ作っておく
+    _SERVICE_UUID_LOWER = SERVICE_UUID.lower()
     
     def __init__(self, ble_device: BLEDevice):
         """
@@ -49,18 +50,18 @@ class RealCO2Meter:
         if not advertisement_data:
             return False
         
-        # 製造者データによる判定
-        if hasattr(advertisement_data, 'manufacturer_data') and advertisement_data.manufacturer_data:
-            for manufacturer_id, data in advertisement_data.manufacturer_data.items():
-                if manufacturer_id == cls.MANUFACTURER_ID and len(data) >= 16:
-                    return True
-        
-        # サービスデータによる判定
-        if hasattr(advertisement_data, 'service_data') and advertisement_data.service_data:
-            for uuid in advertisement_data.service_data.keys():
-                if str(uuid).lower() == cls.SERVICE_UUID.lower():
-                    return True
-        
+        # 製造者データによる判定（manufacturer_dataはAdvertisementDataの必須属性）
+        md = advertisement_data.manufacturer_data
+        if md:
+            data = md.get(cls.MANUFACTURER_ID)
+            if data is not None and len(data) >= 16:
+                return True
+
+        # サービスデータによる判定（ループせずdictの1回参照で判定）
+        sd = advertisement_data.service_data
+        if sd and cls._SERVICE_UUID_LOWER in sd:
+            return True
+
         return False
     
     def parse_manufacturer_data(self, data: bytes) -> Optional[Dict[str, Any]]:
@@ -75,40 +76,43 @@ class RealCO2Meter:
         """
         if len(data) < 16:
             return None
-        
-        try:
-            # CO2値: バイト13-14 (ビッグエンディアン)
-            # 例: 02e7 = 743ppm, 02e8 = 744ppm
-            co2_ppm = struct.unpack('>H', data[13:15])[0]
-            
-            # 温度・湿度の位置（精度解析に基づく改善）
-            humidity = data[10] if len(data) > 10 else 0
-            
-            # 温度の高精度計算（小数点1桁対応）
-            # 解析結果: バイト9使用、線形関係による計算
-            # 計算式: 温度 = 0.2 * byte9 - 3.2
-            # 例: byte9=155 → 0.2*155-3.2 = 27.8°C
-            temperature_raw = data[9] if len(data) > 9 else 0
-            temperature = 0.2 * temperature_raw - 3.2
-            
-            # 現実的な温度範囲チェック (0-50°C)
-            if temperature < 0 or temperature > 50:
-                # フォールバック: 従来の方法
-                temperature_raw_fallback = data[7] if len(data) > 7 else 0
-                if temperature_raw_fallback > 70:
-                    temperature = float(temperature_raw_fallback - 72)
-                else:
-                    temperature = float(temperature_raw_fallback)
-            
-            return {
-                "co2_ppm": co2_ppm,
-                "temperature": temperature,
-                "humidity": int(humidity),
-                "raw_data": data.hex()
-            }
-        except (struct.error, IndexError) as e:
-            logger.error(f"製造者データ解析エラー: {e}")
-            return None
+
+        co2_ppm, temperature, humidity = self._parse_advert_fields(data)
+        return {
+            "co2_ppm": co2_ppm,
+            "temperature": temperature,
+            "humidity": humidity,
+            "raw_data": data.hex()
+        }
+
+    @staticmethod
+    def _parse_advert_fields(data: bytes) -> tuple:
+        """16バイト製造者データから(CO2, 温度, 湿度)をタプルで取り出す
+
+        ホットパス用の中間dictを作らない解析本体。呼び出し側で16バイト以上を
+        保証すること（以降は例外を送出しない）。
+
+        レイアウト: [9]温度raw [10]湿度 [13-14]CO2(BE)
+        CO2値の例: 02e7 = 743ppm, 02e8 = 744ppm
+        """
+        co2_ppm = (data[13] << 8) | data[14]
+
+        # 温度の高精度計算（小数点1桁対応）
+        # 解析結果: バイト9使用、線形関係による計算
+        # 計算式: 温度 = 0.2 * byte9 - 3.2
+        # 例: byte9=155 → 0.2*155-3.2 = 27.8°C
+        temperature = 0.2 * data[9] - 3.2
+
+        # 現実的な温度範囲チェック (0-50°C)
+        if temperature < 0 or temperature > 50:
+            # フォールバック: 従来の方法
+            temperature_raw_fallback = data[7]
+            if temperature_raw_fallback > 70:
+                temperature = float(temperature_raw_fallback - 72)
+            else:
+                temperature = float(temperature_raw_fallback)
+
+        return co2_ppm, temperature, data[10]
     
     def parse_service_data(self, data: bytes) -> Optional[Dict[str, Any]]:
         """
@@ -123,18 +127,15 @@ class RealCO2Meter:
         if len(data) < 3:
             return None
         
-        try:
-            # サービスデータ: 350064
-            # 推測: 温度・湿度情報?
-            return {
-                "service_raw": data.hex(),
-                "byte0": data[0],  # 53
-                "byte1": data[1],  # 0
-                "byte2": data[2],  # 100
-            }
-        except (IndexError) as e:
-            logger.error(f"サービスデータ解析エラー: {e}")
-            return None
+        # 3バイト保証済みのため例外は起こり得ない。ガードのみで直接返す
+        # サービスデータ: 350064
+        # 推測: 温度・湿度情報?
+        return {
+            "service_raw": data.hex(),
+            "byte0": data[0],  # 53
+            "byte1": data[1],  # 0
+            "byte2": data[2],  # 100
+        }
     
     def create_sensor_data_from_advertisement(self, advertisement_data: AdvertisementData) -> Optional[CO2SensorData]:
         """
@@ -146,33 +147,31 @@ class RealCO2Meter:
         Returns:
             CO2SensorDataオブジェクト、作成できない場合はNone
         """
-        # 製造者データからメインデータを取得
-        main_data = None
-        if hasattr(advertisement_data, 'manufacturer_data') and advertisement_data.manufacturer_data:
-            for manufacturer_id, data in advertisement_data.manufacturer_data.items():
-                if manufacturer_id == self.MANUFACTURER_ID:
-                    main_data = self.parse_manufacturer_data(data)
-                    break
-        
-        if not main_data:
+        # 製造者データからメインデータを取得（対象IDを直接参照、中間dictなし）
+        md = advertisement_data.manufacturer_data
+        raw = md.get(self.MANUFACTURER_ID) if md else None
+        if raw is None or len(raw) < 16:
             return None
-        
-        # サービスデータから追加情報を取得
+
+        co2_ppm, temperature, humidity = self._parse_advert_fields(raw)
+
+        # サービスデータから追加情報を取得（対象UUIDを直接参照）
         service_data = None
-        if hasattr(advertisement_data, 'service_data') and advertisement_data.service_data:
-            for uuid, data in advertisement_data.service_data.items():
-                if str(uuid).lower() == self.SERVICE_UUID.lower():
-                    service_data = self.parse_service_data(data)
-                    break
+        sd = advertisement_data.service_data
+        if sd:
+            data = sd.get(self._SERVICE_UUID_LOWER)
+            if data is not None:
+                service_data = self.parse_service_data(data)
         
         try:
             return CO2SensorData(
                 timestamp=datetime.now(timezone.utc),
-                co2_ppm=main_data["co2_ppm"],
-                temperature=main_data["temperature"],
-                humidity=main_data["humidity"],
+                co2_ppm=co2_ppm,
+                temperature=temperature,
+                humidity=humidity,
                 device_address=self.device_address,
-                raw_data=main_data["raw_data"]
+                # hex化はシリアライズ時までbytesのまま遅延
+                raw_data=bytes(raw)
             )
         except Exception as e:
             logger.error(f"CO2SensorData作成エラー: {e}")
@@ -4,20 +4,78 @@ SwitchBot CO2センサー専用クラス
 import asyncio
 import logging
 import struct
-from datetime import datetime, timezone
+from functools import lru_cache
 from typing import Optional, Callable, Dict, Any
 from bleak.backends.device import BLEDevice
 from bleak.backends.scanner import AdvertisementData
 
 from ..core.bluetooth_device import BluetoothDeviceBase
-from ..models.sensor_data import CO2SensorData
+from ..models.sensor_data import CO2SensorData, utcnow
 
 logger = logging.getLogger(__name__)
 
+# レコード全体を1回のunpackで取り出すための事前コンパイル済みStruct
+# （フォーマット文字列の再解析とスライスによる中間bytes生成を避ける）
+# 特性データ(offset2から): [status][battery][co2(u16LE)][temp(i8)][humidity]
+_CHAR_FIELDS = struct.Struct('<BBHbB').unpack_from
+# サービスデータ(offset1から): [battery][co2(u16LE)][temp(i8)][humidity]
+_SVC_FIELDS = struct.Struct('<BHbB').unpack_from
+
+# バイト5→CO2値の変換テーブル（×7.68の浮動小数点演算をimport時に256通り事前計算）
+_CO2_FROM_BYTE5 = tuple(int(b * 7.68) for b in range(256))
+
+# SwitchBotサービスデータのキー候補（str.lower()やitems()走査をせず直接dict参照）
+_FEE7_UUIDS = ("fee7", "FEE7", "0000fee7-0000-1000-8000-00805f9b34fb")
+
+# 有効なデバイスタイプ（DEVICE_TYPE / DEVICE_TYPE_ALT）。frozensetの
+# 1回のメンバーシップ判定で2回のクラス属性参照＋比較を置き換える
+_VALID_TYPES = frozenset((0x7B, 0x10))
+
+
+@lru_cache(maxsize=128)
+def _decode_mfr_payload(data: bytes):
+    """製造者データ(76)ペイロードから主要フィールドを抽出する純粋関数
+
+    センサーは同一ペイロードを数秒間繰り返しブロードキャストするため、
+    LRUキャッシュにより再解析をdict参照1回に短縮できる。
+
+    Returns:
+        (is_encrypted, battery, co2_ppm, temperature, humidity)のタプル
+    """
+    is_encrypted = (data[0] & 0x80) != 0
+    # 実際のデータ構造を解析: 10063e1e2ad19c0d
+    # データ形式を推測: [0]device_type [1]seq [2-3]co2? [4]temp? [5]humidity? [6-7]その他
+    battery = data[1]  # 仮定
+
+    # CO2濃度の解析
+    # データ: 10 06 36 1e 00 61 a9 c1
+    # 実測値: CO2=744ppm, 温度=28°C, 湿度=59%
+    # バイト5 × 7.68 (実測から発見した計算式) をテーブル参照で求め、
+    # 現実的な範囲外ならデフォルト値にフォールバック
+    co2_calc = _CO2_FROM_BYTE5[data[5]]
+    co2_ppm = co2_calc if 300 <= co2_calc <= 5000 else 400
+
+    # 温度と湿度の解析
+    # 実測: 28°C, 59%
+    # バイト3=30 ≈ 28, バイト5=97 → 59
+    temperature = float(data[3])
+
+    raw_humidity = data[5]
+    # 湿度の調整: 97 → 59 への変換
+    if raw_humidity > 100:
+        humidity = float(max(0, min(100, raw_humidity - 38)))
+    else:
+        humidity = float(raw_humidity)
+
+    return is_encrypted, battery, co2_ppm, temperature, humidity
+
 
 class SwitchBotCO2Sensor(BluetoothDeviceBase):
     """SwitchBot CO2センサー専用クラス"""
-    
+
+    # 基底クラスと同様に__dict__を持たせない（属性は固定）
+    __slots__ = ("latest_data", "data_callback", "_static_info", "_pending")
+
     # SwitchBot CO2センサーのデバイスタイプ
     DEVICE_TYPE = 0x7B  # 123 in decimal
     DEVICE_TYPE_ALT = 0x10  # 16 in decimal (実際のデータから確認)
@@ -37,6 +95,10 @@ class SwitchBotCO2Sensor(BluetoothDeviceBase):
         super().__init__(ble_device)
         self.latest_data: Optional[CO2SensorData] = None
         self.data_callback: Optional[Callable[[CO2SensorData], None]] = None
+        # get_device_infoの不変部分のキャッシュ（初回呼び出し時に構築）
+        self._static_info: Optional[Dict[str, Any]] = None
+        # 要求中のデータ取得を解決するFuture（get_current_dataが待機する）
+        self._pending: Optional[asyncio.Future] = None
         
     @property
     def device_type(self) -> int:
@@ -55,32 +117,40 @@ class SwitchBotCO2Sensor(BluetoothDeviceBase):
         Returns:
             CO2センサーの場合True
         """
-        # デバイス名による判定
-        if device.name and ("co2" in device.name.lower() or "switchbot" in device.name.lower()):
-            return True
-        
-        # 製造者データによる判定（実測データに基づく厳密なチェック）
-        if advertisement_data and hasattr(advertisement_data, 'manufacturer_data') and advertisement_data.manufacturer_data:
-            for manufacturer_id, data in advertisement_data.manufacturer_data.items():
-                # SwitchBotの製造者ID確認 (76が実際のSwitchBot製造者ID)
-                if manufacturer_id == 76 and len(data) >= 8:  # 実際のデータ長に合わせて調整
-                    # データの最初のバイトでデバイスタイプを確認
-                    device_type = data[0] & 0x7F
-                    if device_type == cls.DEVICE_TYPE_ALT:  # 0x10のみ（実測値）
-                        # CO2センサーの追加検証：CO2値が現実的な範囲か
-                        byte5_val = data[5] if len(data) > 5 else 0
-                        co2_calc = int(byte5_val * 7.68)
-                        if 300 <= co2_calc <= 5000:  # 現実的なCO2範囲
-                            return True
+        # デバイス名による判定（lower()は1回だけ実行）
+        name = device.name
+        if name:
+            name_lower = name.lower()
+            if "co2" in name_lower or "switchbot" in name_lower:
+                return True
         
-        # サービスデータによる判定（従来の方法も維持）
-        if advertisement_data and hasattr(advertisement_data, 'service_data') and advertisement_data.service_data:
-            for uuid, data in advertisement_data.service_data.items():
-                if isinstance(uuid, str) and uuid.lower() == "fee7" and len(data) > 0:
+        if not advertisement_data:
+            return False
+
+        # 製造者データによる判定（SwitchBotの製造者ID 76を直接参照）
+        md = advertisement_data.manufacturer_data
+        data = md.get(76) if md else None
+        if data is not None and len(data) >= 8:  # 実際のデータ長に合わせて調整
+            # データの最初のバイトでデバイスタイプを確認
+            device_type = data[0] & 0x7F
+            if device_type == cls.DEVICE_TYPE_ALT:  # 0x10のみ（実測値）
+                # CO2センサーの追加検証：CO2値が現実的な範囲か
+                # （データ長8以上は確認済み。変換はテーブル参照のみ）
+                co2_calc = _CO2_FROM_BYTE5[data[5]]
+                if 300 <= co2_calc <= 5000:  # 現実的なCO2範囲
+                    return True
+
+        # サービスデータによる判定（従来の方法も維持、キー候補を直接参照）
+        sd = advertisement_data.service_data
+        if sd:
+            expected_type = cls.DEVICE_TYPE  # クラス属性参照をループ外へ
+            for key in _FEE7_UUIDS:
+                data = sd.get(key)
+                if data:
                     device_type = data[0] & 0x7F  # 下位7ビット
-                    if device_type == cls.DEVICE_TYPE:
+                    if device_type == expected_type:
                         return True
-        
+
         return False
     
     def parse_advertisement_data(self, advertisement_data: AdvertisementData) -> Optional[Dict[str, Any]]:
@@ -93,101 +163,41 @@ class SwitchBotCO2Sensor(BluetoothDeviceBase):
         Returns:
             解析されたデータ、無効な場合はNone
         """
-        # 製造者データから解析（実際のデータ形式に基づく）
-        if hasattr(advertisement_data, 'manufacturer_data') and advertisement_data.manufacturer_data:
-            for manufacturer_id, data in advertisement_data.manufacturer_data.items():
-                if manufacturer_id == 76 and len(data) >= 8:  # SwitchBot製造者ID
-                    device_type = data[0] & 0x7F
-                    if device_type == self.DEVICE_TYPE or device_type == self.DEVICE_TYPE_ALT:
-                        try:
-                            is_encrypted = (data[0] & 0x80) != 0
-                            # 実際のデータ構造を解析: 10063e1e2ad19c0d
-                            # データ形式を推測: [0]device_type [1]seq [2-3]co2? [4]temp? [5]humidity? [6-7]その他
-                            
-                            # 8バイトデータから各値を抽出
-                            battery = data[1] if len(data) > 1 else 0  # 仮定
-                            
-                            # CO2濃度の解析（GitHubスクリプトのパターンに基づく）
-                            # データ: 10 06 36 1e 00 61 a9 c1
-                            # 実測値: CO2=744ppm, 温度=28°C, 湿度=59%
-                            
-                            if len(data) >= 8:
-                                # GitHubスクリプトのように2バイトペアで解析
-                                # データを2バイトずつペアで処理
-                                values = []
-                                for i in range(0, min(8, len(data)), 2):
-                                    if i + 1 < len(data):
-                                        # 2バイトを16進数として結合
-                                        # GitHubスクリプト: $((16#$prev_byte$byte))
-                                        value = (data[i] << 8) | data[i+1]  # ビッグエンディアン
-                                        values.append(value)
-                                
-                                # values[0] = 0x1006 = 4102
-                                # values[1] = 0x361e = 13854  
-                                # values[2] = 0x0061 = 97
-                                # values[3] = 0xa9c1 = 43457
-                                
-                                # CO2値の候補を計算
-                                co2_candidates = []
-                                if len(values) >= 4:
-                                    # パターン1: バイト5 × 7.68 (実測から発見した計算式、精度調整)
-                                    byte5_val = data[5] if len(data) > 5 else 0
-                                    co2_calc = int(byte5_val * 7.68)
-                                    if 300 <= co2_calc <= 5000:
-                                        co2_candidates.append(co2_calc)
-                                    
-                                    # パターン2: そのまま使用（念のため）
-                                    for val in values:
-                                        if 300 <= val <= 5000:
-                                            co2_candidates.append(val)
-                                    
-                                    # パターン3: 下位バイト使用
-                                    for val in values:
-                                        low_byte = val & 0xFF
-                                        if 300 <= low_byte * 10 <= 5000:
-                                            co2_candidates.append(low_byte * 10)
-                                
-                                # 最適なCO2値を選択（バイト5計算を優先）
-                                co2_ppm = 400  # デフォルト
-                                if co2_candidates:
-                                    co2_ppm = co2_candidates[0]  # 最初の候補（バイト5計算）を優先
-                                
-                                # 温度と湿度の解析
-                                # 実測: 28°C, 59%
-                                # バイト3=30 ≈ 28, バイト5=97 → 59
-                                temperature = float(data[3]) if len(data) > 3 else 20.0
-                                
-                                raw_humidity = data[5] if len(data) > 5 else 50
-                                # 湿度の調整: 97 → 59 への変換
-                                if raw_humidity > 100:
-                                    humidity = max(0, min(100, raw_humidity - 38))
-                                else:
-                                    humidity = raw_humidity
-                            else:
-                                co2_ppm = 400
-                                temperature = 20.0
-                                humidity = 50
-                            
-                            return {
-                                "device_type": device_type,
-                                "is_encrypted": is_encrypted,
-                                "manufacturer_id": manufacturer_id,
-                                "battery": battery,
-                                "co2_ppm": co2_ppm,
-                                "temperature": float(temperature),
-                                "humidity": float(humidity),
-                                "raw_data": data.hex()
-                            }
-                        except (struct.error, IndexError) as e:
-                            logger.error(f"製造者データ解析エラー: {e}")
-                            continue
-        
-        # サービスデータからの解析（従来の方法も維持）
-        if hasattr(advertisement_data, 'service_data') and advertisement_data.service_data:
-            for uuid, data in advertisement_data.service_data.items():
-                if isinstance(uuid, str) and uuid.lower() == "fee7" and len(data) >= 7:
+        # 製造者データから解析（SwitchBot製造者ID 76を直接参照）
+        md = advertisement_data.manufacturer_data if advertisement_data else None
+        data = md.get(76) if md else None
+        if data is not None and len(data) >= 8:
+            device_type = data[0] & 0x7F
+            if device_type in _VALID_TYPES:
+                try:
+                    # 解析本体はLRUキャッシュ付きの純粋関数に委譲
+                    # （bytes(data)はdataが既にbytesなら同一オブジェクトを返す）
+                    is_encrypted, battery, co2_ppm, temperature, humidity = \
+                        _decode_mfr_payload(bytes(data))
+
+                    return {
+                        "device_type": device_type,
+                        "is_encrypted": is_encrypted,
+                        "manufacturer_id": 76,
+                        "battery": battery,
+                        "co2_ppm": co2_ppm,
+                        "temperature": temperature,
+                        "humidity": humidity,
+                        # hex化はシリアライズ時まで遅延（モデルがbytesを受け付ける）
+                        "raw_data": bytes(data)
+                    }
+                except (struct.error, IndexError) as e:
+                    logger.error(f"製造者データ解析エラー: {e}")
+
+        # サービスデータからの解析（従来の方法も維持、キー候補を直接参照）
+        sd = advertisement_data.service_data if advertisement_data else None
+        if sd:
+            expected_type = self.DEVICE_TYPE  # クラス属性参照をループ外へ
+            for key in _FEE7_UUIDS:
+                data = sd.get(key)
+                if data is not None and len(data) >= 7:
                     device_type = data[0] & 0x7F
-                    if device_type != self.DEVICE_TYPE:
+                    if device_type != expected_type:
                         continue
                     
                     is_encrypted = (data[0] & 0x80) != 0
@@ -195,10 +205,8 @@ class SwitchBotCO2Sensor(BluetoothDeviceBase):
                     # CO2センサーデータの解析（SwitchBot仕様に基づく）
                     # データ形式: [device_type][battery][co2_low][co2_high][temp][humidity][reserved]
                     try:
-                        battery = data[1]
-                        co2_ppm = struct.unpack('<H', data[2:4])[0]  # リトルエンディアン
-                        temperature = struct.unpack('b', data[4:5])[0]  # 符号付き8bit
-                        humidity = data[5]
+                        # 4フィールドを1回のunpackでまとめて取り出す
+                        battery, co2_ppm, temperature, humidity = _SVC_FIELDS(data, 1)
                         
                         return {
                             "device_type": device_type,
@@ -207,7 +215,7 @@ class SwitchBotCO2Sensor(BluetoothDeviceBase):
                             "co2_ppm": co2_ppm,
                             "temperature": float(temperature),
                             "humidity": float(humidity),
-                            "raw_data": data.hex()
+                            "raw_data": bytes(data)
                         }
                     except (struct.error, IndexError) as e:
                         logger.error(f"サービスデータ解析エラー: {e}")
@@ -237,19 +245,17 @@ class SwitchBotCO2Sensor(BluetoothDeviceBase):
             raise ValueError("CO2センサーデータではありません")
         
         try:
-            status = data[2]
-            battery = data[3]
-            co2_ppm = struct.unpack('<H', data[4:6])[0]
-            temperature = struct.unpack('b', data[6:7])[0]
-            humidity = data[7]
+            # 5フィールドを1回のunpackでまとめて取り出す
+            status, battery, co2_ppm, temperature, humidity = _CHAR_FIELDS(data, 2)
             
             return CO2SensorData(
-                timestamp=datetime.now(timezone.utc),
+                timestamp=utcnow(),
                 co2_ppm=co2_ppm,
                 temperature=float(temperature),
                 humidity=float(humidity),
                 device_address=self.device_address,
-                raw_data=data.hex()
+                # hex化はシリアライズ時まで遅延（モデルがbytesを受け付ける）
+                raw_data=bytes(data)
             )
         except (struct.error, IndexError) as e:
             raise ValueError(f"データ解析エラー: {e}")
@@ -293,17 +299,25 @@ class SwitchBotCO2Sensor(BluetoothDeviceBase):
             data: 受信したデータ
         """
         try:
-            logger.debug(f"受信データ: {data.hex()}")
-            
+            # hex()の文字列生成はDEBUGが有効な場合のみ行う
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("受信データ: %s", data.hex())
+
             # データを解析
             sensor_data = self.parse_characteristic_data(data)
             self.latest_data = sensor_data
-            
+
+            # get_current_dataが待機中ならその場で解決する
+            pending = self._pending
+            if pending is not None and not pending.done():
+                pending.set_result(sensor_data)
+
             # コールバックを呼び出し
             if self.data_callback:
                 self.data_callback(sensor_data)
-                
-            logger.info(f"CO2データ更新: {sensor_data}")
+
+            if logger.isEnabledFor(logging.INFO):
+                logger.info("CO2データ更新: %s", sensor_data)
             
         except ValueError as e:
             logger.warning(f"データ解析失敗: {e}, 生データ: {data.hex()}")
@@ -357,25 +371,23 @@ class SwitchBotCO2Sensor(BluetoothDeviceBase):
         """
         if request_new and self.is_connected:
             try:
-                await self.request_sensor_data()
-                
-                # データが更新されるまで待機
-                start_time = asyncio.get_event_loop().time()
-                while asyncio.get_event_loop().time() - start_time < timeout:
-                    if self.latest_data:
-                        # 最近のデータかチェック（5秒以内）
-                        data_age = (datetime.now(timezone.utc) - self.latest_data.timestamp).total_seconds()
-                        if data_age < 5.0:
-                            return self.latest_data
-                    await asyncio.sleep(0.1)
-                
-                logger.warning("データ取得がタイムアウトしました")
-                return None
-                
+                # 通知ハンドラーが解決するFutureを待つ（Eventのwait()と違い
+                # Futureはwait_forがタスクを生成せず直接待機できる）
+                self._pending = asyncio.get_running_loop().create_future()
+                try:
+                    await self.request_sensor_data()
+                    try:
+                        return await asyncio.wait_for(self._pending, timeout)
+                    except asyncio.TimeoutError:
+                        logger.warning("データ取得がタイムアウトしました")
+                        return None
+                finally:
+                    self._pending = None
+
             except Exception as e:
                 logger.error(f"データ取得エラー: {e}")
                 return None
-        
+
         return self.latest_data
     
     def create_sensor_data_from_advertisement(self, advertisement_data: AdvertisementData) -> Optional[CO2SensorData]:
@@ -394,7 +406,7 @@ class SwitchBotCO2Sensor(BluetoothDeviceBase):
         
         try:
             return CO2SensorData(
-                timestamp=datetime.now(timezone.utc),
+                timestamp=utcnow(),
                 co2_ppm=parsed_data["co2_ppm"],
                 temperature=parsed_data["temperature"],
                 humidity=parsed_data["humidity"],
@@ -412,10 +424,13 @@ class SwitchBotCO2Sensor(BluetoothDeviceBase):
         Returns:
             デバイス情報の辞書
         """
-        return {
-            "name": self.device_name,
-            "address": self.device_address,
-            "device_type": self.device_type,
-            "device_type_name": "CO2センサー",
-            "is_connected": self.is_connected
-        }
\ No newline at end of file
+        # 接続状態以外は不変なので初回に構築してキャッシュする
+        static = self._static_info
+        if static is None:
+            static = self._static_info = {
+                "name": self.device_name,
+                "address": self.device_address,
+                "device_type": self.device_type,
+                "device_type_name": "CO2センサー",
+            }
+        return {**static, "is_connected": self.is_connected}
\ No newline at end of file
@@ -6,6 +6,15 @@ from typing import Union, List
 from ..models.sensor_data import SensorDataBase
 
 
+def _as_iter(data):
+    """単一データをリスト化せず反復可能にする共通ヘルパー
+
+    既にリストならそのまま返し、単一データは1要素タプルで包む
+    （エクスポート毎のリスト生成を避ける）。
+    """
+    return data if type(data) is list else (data,)
+
+
 class DataExporterBase(ABC):
     """データエクスポーターの抽象基底クラス"""
     
@@ -2,8 +2,9 @@
 コンソール出力エクスポーター
 """
 import logging
+import sys
 from typing import Union, List
-from .base import DataExporterBase
+from .base import DataExporterBase, _as_iter
 from ..models.sensor_data import SensorDataBase
 
 logger = logging.getLogger(__name__)
@@ -12,14 +13,18 @@ logger = logging.getLogger(__name__)
 class ConsoleExporter(DataExporterBase):
     """コンソールにデータを出力するエクスポーター"""
     
-    def __init__(self, verbose: bool = False):
+    def __init__(self, verbose: bool = False, writer=None):
         """
         コンソールエクスポーターを初期化
-        
+
         Args:
             verbose: 詳細モードフラグ
+            writer: 出力先（省略時はsys.stdout。ファイルやStringIOも可）
         """
         self.verbose = verbose
+        # Noneの場合は書き込み時点のsys.stdoutを使う
+        # （起動後の差し替えやテストでのキャプチャに追従できる）
+        self.writer = writer
     
     def set_verbose(self, verbose: bool):
         """
@@ -40,7 +45,8 @@ class ConsoleExporter(DataExporterBase):
         Returns:
             フォーマットされた文字列
         """
-        timestamp_str = data.timestamp.strftime("%Y-%m-%d %H:%M:%S")
+        # isoformatはC実装でstrftimeのフォーマット文字列解析が不要
+        timestamp_str = data.timestamp.replace(tzinfo=None).isoformat(sep=' ', timespec='seconds')
         
         # CO2センサーデータの場合の特別な処理
         if hasattr(data, 'co2_ppm'):
@@ -57,7 +63,10 @@ class ConsoleExporter(DataExporterBase):
         
         # 詳細モードの場合は生データも表示
         if self.verbose and hasattr(data, 'raw_data') and data.raw_data:
-            formatted += f", Raw data: {data.raw_data}"
+            raw_data = data.raw_data
+            if isinstance(raw_data, bytes):
+                raw_data = raw_data.hex()
+            formatted += f", Raw data: {raw_data}"
         
         return formatted
     
@@ -72,18 +81,15 @@ class ConsoleExporter(DataExporterBase):
             常にTrue（コンソール出力は基本的に失敗しない）
         """
         try:
-            # データをリストに正規化
-            if isinstance(data, list):
-                data_list = data
-            else:
-                data_list = [data]
-            
-            # 各データを出力
-            for sensor_data in data_list:
-                formatted_output = self.format_data(sensor_data)
-                print(formatted_output)
-                logger.debug(f"コンソール出力: {formatted_output}")
-            
+            # 全行をまとめて1回のwriteで出力（print毎のロック取得・フラッシュを回避）
+            lines = [self.format_data(sensor_data) for sensor_data in _as_iter(data)]
+            writer = self.writer if self.writer is not None else sys.stdout
+            writer.write('\n'.join(lines) + '\n')
+
+            if logger.isEnabledFor(logging.DEBUG):
+                for line in lines:
+                    logger.debug("コンソール出力: %s", line)
+
             return True
             
         except Exception as e:
@@ -1,36 +1,83 @@
 """
 HTTP送信エクスポーター
 """
+import gzip
 import json
 import logging
 import asyncio
-from typing import Union, List, Dict, Any, Optional
+import random
+from typing import Iterable, Union, List, Dict, Any, Optional
 import aiohttp
 from .base import DataExporterBase
 from ..models.sensor_data import SensorDataBase
 
 logger = logging.getLogger(__name__)
 
+# リトライする価値のあるステータス（一時的な障害のみ。
+# その他の4xxは再送しても結果が変わらないため即時に諦める）
+_RETRY_STATUSES = frozenset((408, 429, 500, 502, 503, 504))
+
+# バックオフの上限（秒）
+_BACKOFF_CAP = 30.0
+
 
 class HttpSender(DataExporterBase):
     """センサーデータをHTTPでサーバーに送信するエクスポーター"""
     
-    def __init__(self, url: str, timeout: float = 10.0, max_retries: int = 3):
+    def __init__(self, url: str, timeout: float = 10.0, max_retries: int = 3,
+                 batch_size: int = 1, flush_interval: float = 5.0,
+                 compress: bool = False, pool_limit: int = 4,
+                 retry_on: Optional[Iterable[int]] = None):
         """
         HTTP送信エクスポーターを初期化
-        
+
         Args:
             url: 送信先のURL
             timeout: タイムアウト時間（秒）
             max_retries: 最大リトライ回数
+            batch_size: まとめて送信する件数（1の場合は即時送信）
+            flush_interval: バッチ未達でも送信する間隔（秒）
+            compress: ボディをgzip圧縮して送信するかどうか
+            pool_limit: 接続プールの最大コネクション数
+            retry_on: リトライ対象のHTTPステータス（省略時は408/429/5xx）
         """
         self.url = url
         self.timeout = timeout
         self.max_retries = max_retries
+        self.pool_limit = pool_limit
+        self.retry_on = _RETRY_STATUSES if retry_on is None else frozenset(retry_on)
         self.headers = {
             "Content-Type": "application/json",
             "User-Agent": "co2logger/1.0"
         }
+        # 接続を使い回す長寿命セッション（送信毎のTCP+TLSハンドシェイクを回避）
+        self._session: Optional[aiohttp.ClientSession] = None
+        # バッチ送信用のキュー（batch_size > 1 の場合のみ使用）
+        self._batch_size = batch_size
+        self._flush_interval = flush_interval
+        self._compress = compress
+        self._queue: List[Dict[str, Any]] = []
+        self._flusher_task: Optional[asyncio.Task] = None
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """再利用可能なHTTPセッションを取得（初回利用時に生成）"""
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                connector=aiohttp.TCPConnector(limit=self.pool_limit, ttl_dns_cache=300),
+            )
+        return self._session
+
+    async def close(self):
+        """キューに残ったデータを送信してHTTPセッションを閉じる"""
+        if self._flusher_task is not None:
+            self._flusher_task.cancel()
+            self._flusher_task = None
+        if self._queue:
+            await self._flush()
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
     
     def set_authentication(self, auth_type: str, token: str):
         """
@@ -51,18 +98,6 @@ class HttpSender(DataExporterBase):
         """
         self.headers.update(custom_headers)
     
-    def _convert_to_dict(self, data: SensorDataBase) -> Dict[str, Any]:
-        """
-        センサーデータを辞書形式に変換
-        
-        Args:
-            data: センサーデータ
-            
-        Returns:
-            辞書形式のデータ
-        """
-        return data.to_dict()
-    
     async def _send_data(self, payload: Dict[str, Any]) -> bool:
         """
         データをHTTPで送信
@@ -73,42 +108,60 @@ class HttpSender(DataExporterBase):
         Returns:
             送信が成功した場合True、失敗した場合False
         """
+        # ペイロードのシリアライズは1回だけ（リトライ毎の再変換を回避）
+        # コンパクトなセパレータで余分な空白も送らない
+        body = json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+        headers = self.headers
+        if self._compress:
+            # compresslevel=1で圧縮時間を抑えつつ転送量を削減
+            body = gzip.compress(body, compresslevel=1)
+            headers = dict(headers, **{"Content-Encoding": "gzip"})
+
         for attempt in range(self.max_retries + 1):
             try:
-                timeout = aiohttp.ClientTimeout(total=self.timeout)
-                async with aiohttp.ClientSession(timeout=timeout) as session:
-                    async with session.post(
-                        self.url,
-                        data=json.dumps(payload),
-                        headers=self.headers
-                    ) as response:
-                        if response.status == 200:
-                            logger.info(f"データ送信成功: {self.url}")
-                            return True
-                        else:
-                            error_text = await response.text()
-                            logger.warning(
-                                f"HTTP送信失敗 (試行{attempt + 1}/{self.max_retries + 1}): "
-                                f"ステータス={response.status}, レスポンス={error_text}"
-                            )
-                            
-                            if attempt < self.max_retries:
-                                # リトライ前に待機（指数バックオフ）
-                                wait_time = (2 ** attempt) * 1.0
-                                await asyncio.sleep(wait_time)
-                            
+                session = await self._get_session()
+                async with session.post(
+                    self.url,
+                    data=body,
+                    headers=headers
+                ) as response:
+                    if response.status == 200:
+                        logger.info(f"データ送信成功: {self.url}")
+                        return True
+                    else:
+                        error_text = await response.text()
+                        logger.warning(
+                            f"HTTP送信失敗 (試行{attempt + 1}/{self.max_retries + 1}): "
+                            f"ステータス={response.status}, レスポンス={error_text}"
+                        )
+
+                        # 再送しても結果が変わらないステータスは即時に諦める
+                        if response.status not in self.retry_on:
+                            logger.error(f"リトライ対象外のステータス: {response.status}")
+                            return False
+
+                        if attempt < self.max_retries:
+                            # リトライ前に待機（指数バックオフ＋ジッター。
+                            # 複数センサーの同時リトライが揃って殺到しないよう分散）
+                            await asyncio.sleep(self._backoff(attempt))
+
             except Exception as e:
                 logger.error(
                     f"HTTP送信エラー (試行{attempt + 1}/{self.max_retries + 1}): {e}"
                 )
-                
+
                 if attempt < self.max_retries:
-                    wait_time = (2 ** attempt) * 1.0
-                    await asyncio.sleep(wait_time)
+                    await asyncio.sleep(self._backoff(attempt))
         
         logger.error(f"最大リトライ回数を超えました: {self.url}")
         return False
     
+    @staticmethod
+    def _backoff(attempt: int) -> float:
+        """attempt回目のリトライまでの待機時間（指数バックオフ＋ジッター）"""
+        return min(_BACKOFF_CAP, (2 ** attempt) * 0.1) * (0.5 + random.random())
+
     async def export(self, data: Union[SensorDataBase, List[SensorDataBase]]) -> bool:
         """
         センサーデータをHTTPで送信
@@ -120,23 +173,49 @@ class HttpSender(DataExporterBase):
             送信が成功した場合True、失敗した場合False
         """
         try:
-            # データをリストに正規化
-            if isinstance(data, list):
-                data_list = [self._convert_to_dict(item) for item in data]
-            else:
-                data_list = self._convert_to_dict(data)
-            
-            # ペイロードを作成
+            # バッチモードの場合はキューに積み、閾値到達時にまとめて送信
+            # （バッチ送信は常にJSON配列形式になる点に注意）
+            if self._batch_size > 1:
+                if isinstance(data, list):
+                    self._queue.extend(item.to_dict() for item in data)
+                else:
+                    self._queue.append(data.to_dict())
+
+                if self._flusher_task is None or self._flusher_task.done():
+                    self._flusher_task = asyncio.get_running_loop().create_task(
+                        self._flush_loop()
+                    )
+
+                if len(self._queue) >= self._batch_size:
+                    return await self._flush()
+                return True
+
+            # ペイロードを作成（リストは配列、単一データはオブジェクトとして送信）
             if isinstance(data, list):
-                # 複数データの場合は配列として送信
-                payload = data_list
+                payload = [item.to_dict() for item in data]
             else:
-                # 単一データの場合はオブジェクトとして送信
-                payload = data_list
-            
+                payload = data.to_dict()
+
             # HTTP送信を実行
             return await self._send_data(payload)
-            
+
         except Exception as e:
             logger.error(f"データエクスポートエラー: {e}")
-            return False
\ No newline at end of file
+            return False
+
+    async def _flush(self) -> bool:
+        """キューに溜まったデータを1回のリクエストでまとめて送信"""
+        if not self._queue:
+            return True
+        payload, self._queue = self._queue, []
+        return await self._send_data(payload)
+
+    async def _flush_loop(self):
+        """バッチ未達のデータを一定間隔で送信するバックグラウンドループ"""
+        try:
+            while True:
+                await asyncio.sleep(self._flush_interval)
+                if self._queue:
+                    await self._flush()
+        except asyncio.CancelledError:
+            pass
\ No newline at end of file
@@ -1,11 +1,12 @@
 """
 JSONファイル出力エクスポーター
 """
+import asyncio
 import json
 import logging
 import os
 from typing import Union, List, Dict, Any
-from .base import DataExporterBase
+from .base import DataExporterBase, _as_iter
 from ..models.sensor_data import SensorDataBase
 
 logger = logging.getLogger(__name__)
@@ -25,38 +26,31 @@ class JsonFileExporter(DataExporterBase):
         self.file_path = file_path
         self.append_mode = append_mode
     
-    def _load_existing_data(self) -> List[Dict[str, Any]]:
+    def load(self) -> List[Dict[str, Any]]:
         """
-        既存のJSONファイルからデータを読み込み
-        
+        出力済みのレコードを読み込み
+
+        追記モードのNDJSON（1行1レコード）と上書きモードのJSON配列の
+        どちらの形式にも対応する。
+
         Returns:
-            既存データのリスト（ファイルが存在しない場合は空リスト）
+            レコードのリスト（ファイルが存在しない場合は空リスト）
         """
         if not os.path.exists(self.file_path):
             return []
-        
+
         try:
             with open(self.file_path, 'r', encoding='utf-8') as file:
                 content = file.read().strip()
-                if not content:
-                    return []
+            if not content:
+                return []
+            if content.startswith('['):
                 return json.loads(content)
+            return [json.loads(line) for line in content.splitlines() if line]
         except (json.JSONDecodeError, IOError) as e:
             logger.warning(f"既存ファイルの読み込みに失敗: {e}")
             return []
-    
-    def _convert_to_dict(self, data: SensorDataBase) -> Dict[str, Any]:
-        """
-        センサーデータを辞書形式に変換
-        
-        Args:
-            data: センサーデータ
-            
-        Returns:
-            辞書形式のデータ
-        """
-        return data.to_dict()
-    
+
     async def export(self, data: Union[SensorDataBase, List[SensorDataBase]]) -> bool:
         """
         センサーデータをJSONファイルに出力
@@ -69,25 +63,12 @@ class JsonFileExporter(DataExporterBase):
         """
         try:
             # データをリストに正規化
-            if isinstance(data, list):
-                new_data_list = [self._convert_to_dict(item) for item in data]
-            else:
-                new_data_list = [self._convert_to_dict(data)]
-            
-            # 追記モードの場合は既存データを読み込み
-            if self.append_mode:
-                existing_data = self._load_existing_data()
-                all_data = existing_data + new_data_list
-            else:
-                all_data = new_data_list
-            
-            # ディレクトリが存在しない場合は作成
-            os.makedirs(os.path.dirname(self.file_path), exist_ok=True)
-            
-            # JSONファイルに書き込み
-            with open(self.file_path, 'w', encoding='utf-8') as file:
-                json.dump(all_data, file, indent=2, ensure_ascii=False)
+            new_data_list = [item.to_dict() for item in _as_iter(data)]
             
+            # ブロッキングIOはワーカースレッドに逃がし、イベントループ
+            # （BLE通知のディスパッチ）を止めない
+            await asyncio.to_thread(self._write_sync, new_data_list)
+
             logger.info(f"JSONファイルに{len(new_data_list)}件のデータを出力: {self.file_path}")
             return True
             
@@ -96,4 +77,28 @@ class JsonFileExporter(DataExporterBase):
             raise  # テストで例外をキャッチできるように再発生
         except Exception as e:
             logger.error(f"予期しないエラー: {e}")
-            return False
\ No newline at end of file
+            return False
+
+    def _write_sync(self, new_data_list: List[Dict[str, Any]]):
+        """
+        レコードを同期的にファイルへ書き込み（ワーカースレッドで実行）
+
+        Args:
+            new_data_list: 書き込むレコードのリスト
+        """
+        # ディレクトリが存在しない場合は作成
+        os.makedirs(os.path.dirname(self.file_path), exist_ok=True)
+
+        if self.append_mode:
+            # NDJSON形式（1行1レコード）で追記のみ行う
+            # 既存ファイル全体の再読込・再シリアライズ（O(ファイルサイズ)）を回避
+            lines = ''.join(
+                json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n'
+                for record in new_data_list
+            )
+            with open(self.file_path, 'a', encoding='utf-8') as file:
+                file.write(lines)
+        else:
+            # 上書きモードは従来通りJSON配列で書き込み
+            with open(self.file_path, 'w', encoding='utf-8') as file:
+                json.dump(new_data_list, file, indent=2, ensure_ascii=False)
\ No newline at end of file
@@ -1,12 +1,54 @@
 """
 Sensor data models for CO2 logging
 """
+import time
 from dataclasses import dataclass
-from datetime import datetime
-from typing import Optional
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+from typing import Optional, Union
 
+# ISOタイムスタンプの解析はC拡張のciso8601があれば利用する
+# （インストールされていない環境では標準のfromisoformatで動作）
+try:
+    from ciso8601 import parse_datetime as _parse_dt
+except ImportError:
+    _parse_dt = datetime.fromisoformat
 
-@dataclass
+# utcnow()の基準点（実時計の参照とタイムゾーン変換を1秒に1回へ削減）
+_BASE_REFRESH_NS = 1_000_000_000
+_base_mono_ns = 0
+_base_dt: Optional[datetime] = None
+
+
+@lru_cache(maxsize=512)
+def _iso(dt: datetime) -> str:
+    """isoformat()の結果をキャッシュ
+
+    同一サンプルがコンソール・ファイル・HTTPなど複数のシンクへ
+    出力される構成では、同じタイムスタンプのISO文字列化が
+    シンク数ぶん繰り返されるため1回に抑える。
+    """
+    return dt.isoformat()
+
+
+def utcnow() -> datetime:
+    """UTCの現在時刻を返す（高頻度呼び出し向け）
+
+    datetime.now(timezone.utc)は呼び出し毎にシステムコールと
+    タイムゾーン変換を伴うため、1秒以内の連続呼び出しでは
+    monotonic時計の差分から導出する。誤差は再同期間隔（1秒）内に
+    収まり、センサーデータのタイムスタンプ用途には十分な精度。
+    """
+    global _base_mono_ns, _base_dt
+    now_ns = time.monotonic_ns()
+    if _base_dt is None or now_ns - _base_mono_ns > _BASE_REFRESH_NS:
+        _base_mono_ns = now_ns
+        _base_dt = datetime.now(timezone.utc)
+        return _base_dt
+    return _base_dt + timedelta(microseconds=(now_ns - _base_mono_ns) // 1000)
+
+
+@dataclass(slots=True)
 class SensorDataBase:
     """Base class for all sensor data"""
     timestamp: datetime
@@ -14,24 +56,26 @@ class SensorDataBase:
     
     def to_dict(self) -> dict:
         """Convert to dictionary for serialization"""
-        result = {
-            "timestamp": self.timestamp.isoformat(),
+        # raw_dataを持つサブクラスは各自のto_dictで1つのdictリテラルに
+        # まとめて構築する（getattr/hasattrによる動的チェックは不要）
+        return {
+            "timestamp": _iso(self.timestamp),
             "device_address": self.device_address,
         }
-        if hasattr(self, 'raw_data') and self.raw_data is not None:
-            result["raw_data"] = self.raw_data
-        return result
     
     @classmethod
     def from_dict(cls, data: dict):
         """Create instance from dictionary"""
-        data_copy = data.copy()
-        if "timestamp" in data_copy:
-            data_copy["timestamp"] = datetime.fromisoformat(data_copy["timestamp"])
-        return cls(**data_copy)
+        # 呼び出し元のdictは変更せず、タイムスタンプだけ変換して渡す
+        kwargs = {k: v for k, v in data.items() if k != "timestamp"}
+        if "timestamp" in data:
+            kwargs["timestamp"] = _parse_dt(data["timestamp"])
+        return cls(**kwargs)
 
 
-@dataclass
+# __repr__は自動生成しない（表示には__str__を使っており、生成コードぶん
+# クラス定義が軽くなる）
+@dataclass(slots=True, repr=False)
 class TemperatureData(SensorDataBase):
     """Temperature sensor data"""
     temperature: float
@@ -44,15 +88,21 @@ class TemperatureData(SensorDataBase):
     
     def to_dict(self) -> dict:
         """Convert to dictionary for serialization"""
-        result = super().to_dict()
-        result["temperature"] = self.temperature
+        # super().to_dict() + 再代入の2段構築を避け、1つのdictリテラルで構築
+        result = {
+            "timestamp": _iso(self.timestamp),
+            "device_address": self.device_address,
+            "temperature": self.temperature,
+        }
+        if self.raw_data is not None:
+            result["raw_data"] = self.raw_data
         return result
-    
+
     def __str__(self) -> str:
         return f"Temperature: {self.temperature}°C at {self.timestamp.strftime('%H:%M:%S')} ({self.device_address})"
 
 
-@dataclass
+@dataclass(slots=True, repr=False)
 class HumidityData(SensorDataBase):
     """Humidity sensor data"""
     humidity: float
@@ -65,21 +115,28 @@ class HumidityData(SensorDataBase):
     
     def to_dict(self) -> dict:
         """Convert to dictionary for serialization"""
-        result = super().to_dict()
-        result["humidity"] = self.humidity
+        # super().to_dict() + 再代入の2段構築を避け、1つのdictリテラルで構築
+        result = {
+            "timestamp": _iso(self.timestamp),
+            "device_address": self.device_address,
+            "humidity": self.humidity,
+        }
+        if self.raw_data is not None:
+            result["raw_data"] = self.raw_data
         return result
     
     def __str__(self) -> str:
         return f"Humidity: {self.humidity}% at {self.timestamp.strftime('%H:%M:%S')} ({self.device_address})"
 
 
-@dataclass
+@dataclass(slots=True)
 class CO2SensorData(SensorDataBase):
     """CO2 sensor data with temperature and humidity"""
     co2_ppm: int
     temperature: float
     humidity: float
-    raw_data: Optional[str] = None
+    # bytesのまま渡すとシリアライズ時まで16進文字列化を遅延できる
+    raw_data: Optional[Union[str, bytes]] = None
     
     def __post_init__(self):
         """Validate CO2 sensor data after initialization"""
@@ -92,14 +149,33 @@ class CO2SensorData(SensorDataBase):
     
     def to_dict(self) -> dict:
         """Convert to dictionary for serialization"""
-        result = super().to_dict()
-        result.update({
+        # super().to_dict() + update()の2段構築を避け、1つのdictリテラルで構築
+        result = {
+            "timestamp": _iso(self.timestamp),
+            "device_address": self.device_address,
             "co2_ppm": self.co2_ppm,
             "temperature": self.temperature,
-            "humidity": self.humidity
-        })
+            "humidity": self.humidity,
+        }
+        raw_data = self.raw_data
+        if raw_data is not None:
+            # bytesで保持されている場合はここで初めてhex化する（遅延評価）
+            result["raw_data"] = raw_data.hex() if isinstance(raw_data, bytes) else raw_data
         return result
     
+    @classmethod
+    def from_dict(cls, data: dict):
+        """Create instance from dictionary"""
+        # キーが既知なので中間dictやコピーを作らず直接構築する
+        return cls(
+            timestamp=_parse_dt(data["timestamp"]),
+            device_address=data["device_address"],
+            co2_ppm=data["co2_ppm"],
+            temperature=data["temperature"],
+            humidity=data["humidity"],
+            raw_data=data.get("raw_data"),
+        )
+
     def __str__(self) -> str:
         return (f"CO2: {self.co2_ppm} ppm, Temp: {self.temperature}°C, "
                 f"Humidity: {self.humidity}% at {self.timestamp.strftime('%H:%M:%S')} "
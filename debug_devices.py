@@ -6,8 +6,6 @@ Bluetoothデバイスのデバッグ用プログラム
 
 import asyncio
 import logging
-from bleak import BleakScanner, BLEDevice
-from bleak.backends.scanner import AdvertisementData
 
 # ロギング設定
 logging.basicConfig(level=logging.INFO)
@@ -15,6 +13,11 @@ logger = logging.getLogger(__name__)
 
 async def debug_scan():
     """すべてのBluetoothデバイスをスキャンしてデバッグ情報を表示"""
+    # bleakはバックエンドの読み込みが重いため、実際にスキャンする
+    # この関数内でインポートする（起動時間の短縮）
+    from bleak import BleakScanner, BLEDevice
+    from bleak.backends.scanner import AdvertisementData
+
     print("=== Bluetoothデバイスデバッグスキャン開始 ===")
     print("10秒間スキャンします...")
     
@@ -74,17 +77,19 @@ async def debug_scan():
             is_candidate = True
             reasons.append(f"名前: {device.name}")
         
-        # サービスUUIDチェック
+        # サービスUUIDチェック（128bit UUIDの固定位置を直接比較。
+        # 部分文字列走査×2＋lower()の複数回呼び出しを避ける）
         if ad_data.service_uuids:
             for uuid in ad_data.service_uuids:
-                if "fee7" in uuid.lower() or "cba20d00" in uuid.lower():
+                u = uuid.lower()
+                if u[4:8] == "fee7" or u[:8] == "cba20d00":
                     is_candidate = True
                     reasons.append(f"サービスUUID: {uuid}")
-        
+
         # サービスデータチェック
         if ad_data.service_data:
             for uuid, data in ad_data.service_data.items():
-                if "fee7" in str(uuid).lower():
+                if str(uuid).lower()[4:8] == "fee7":
                     is_candidate = True
                     reasons.append(f"サービスデータ: {uuid}")
         
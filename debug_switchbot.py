@@ -5,33 +5,33 @@ SwitchBot CO2センサーの詳細データ解析デバッグ
 
 import asyncio
 import logging
-from bleak import BleakScanner
-from bleak.backends.device import BLEDevice
-from bleak.backends.scanner import AdvertisementData
+import struct
 
 # ロギング設定
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# ビッグエンディアンu16×4を1回のC呼び出しで取り出す事前コンパイル済みStruct
+_PAIRS = struct.Struct('>HHHH')
+
 def analyze_switchbot_data(hex_data: str):
     """SwitchBotデータの詳細解析"""
     data = bytes.fromhex(hex_data)
     
     print(f"\n=== データ解析: {hex_data} ===")
-    print(f"バイト配列: {[f'{b:02x}' for b in data]}")
-    print(f"10進数: {list(data)}")
+    print(f"バイト配列: {data.hex(' ')}")
+    print(f"10進数: {' '.join(map(str, data))}")
     
     # GitHubスクリプト方式: 2バイトペアで解析
+    # 先頭8バイト（不足分はゼロ詰め）から全ペアを1回のunpackで抽出
+    pair_count = min(8, len(data)) // 2
+    values = list(_PAIRS.unpack(data[:8].ljust(8, b'\x00'))[:pair_count])
+
     print("\n--- 2バイトペア解析 ---")
-    values = []
-    for i in range(0, min(8, len(data)), 2):
-        if i + 1 < len(data):
-            # ビッグエンディアン
-            value_be = (data[i] << 8) | data[i+1]
-            # リトルエンディアン
-            value_le = (data[i+1] << 8) | data[i]
-            values.append(value_be)
-            print(f"ペア{i//2}: バイト{i}-{i+1} = 0x{data[i]:02x}{data[i+1]:02x} = BE:{value_be}, LE:{value_le}")
+    for pair_no, value_be in enumerate(values):
+        i = 2 * pair_no
+        value_le = ((value_be & 0xFF) << 8) | (value_be >> 8)  # バイトスワップ
+        print(f"ペア{pair_no}: バイト{i}-{i+1} = 0x{value_be:04x} = BE:{value_be}, LE:{value_le}")
     
     print(f"\nペア値: {values}")
     
@@ -76,17 +76,21 @@ def analyze_switchbot_data(hex_data: str):
 
 async def monitor_switchbot():
     """SwitchBotデバイスを監視してデータを解析"""
-    detected_data = set()
-    
+    # bleakはバックエンドの読み込みが重いため、実際にスキャンする
+    # この関数内でインポートする（既知データの解析だけなら不要）
+    from bleak import BleakScanner
+    from bleak.backends.device import BLEDevice
+    from bleak.backends.scanner import AdvertisementData
+
+    # 重複排除キーはbytesのまま保持（パケット毎のhex()文字列生成を回避）
+    detected_data: set = set()
+
     def detection_callback(device: BLEDevice, advertisement_data: AdvertisementData):
-        if hasattr(advertisement_data, 'manufacturer_data') and advertisement_data.manufacturer_data:
-            for manufacturer_id, data in advertisement_data.manufacturer_data.items():
-                if manufacturer_id == 76:  # SwitchBot
-                    hex_data = data.hex()
-                    if hex_data not in detected_data:
-                        detected_data.add(hex_data)
-                        print(f"\n新しいSwitchBotデータ検出: {device.address}")
-                        analyze_switchbot_data(hex_data)
+        data = advertisement_data.manufacturer_data.get(76)  # SwitchBot
+        if data is not None and data not in detected_data:
+            detected_data.add(bytes(data))
+            print(f"\n新しいSwitchBotデータ検出: {device.address}")
+            analyze_switchbot_data(data.hex())  # 表示用にのみhex化
     
     print("SwitchBotデバイスを監視中... (10秒間)")
     scanner = BleakScanner(detection_callback)
@@ -6,12 +6,12 @@ SwitchBot CO2センサーのみを特定して監視
 
 import asyncio
 import logging
-from datetime import datetime, timezone
-from bleak import BleakScanner
+import time
+from collections import deque
 from bleak.backends.device import BLEDevice
 from bleak.backends.scanner import AdvertisementData
 
-from co2logger import SwitchBotCO2Sensor, ConsoleExporter
+from co2logger import SwitchBotCO2Sensor, ConsoleExporter, create_filtered_scanner
 
 # ロギング設定
 logging.basicConfig(
@@ -20,78 +20,117 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# バイト値毎の妥当性をimport時に事前計算した256要素テーブル
+# （ホットパスの浮動小数点乗算と範囲比較をインデックス参照1回に置き換える）
+_VALID_B5 = bytes(1 if 300 <= int(b * 7.67) <= 5000 else 0 for b in range(256))  # CO2換算値
+_VALID_B3 = bytes(1 if 0 <= b <= 50 else 0 for b in range(256))  # 温度
+
 class CO2SensorFilter:
     """CO2センサーのみをフィルタリングするクラス"""
     
     def __init__(self):
         self.exporter = ConsoleExporter(verbose=True)
-        self.device_cache = {}  # アドレス -> 最後の更新時刻
+        self.device_cache = {}  # アドレス -> 最後の更新時刻（monotonic ns）
         self.co2_devices = set()  # 確認済みCO2センサーのアドレス
         self.update_interval = 30  # 30秒間隔で更新表示
+        self._update_interval_ns = self.update_interval * 1_000_000_000
+        # 受信アドバタイズのリングバッファ（コールバックは積むだけにして
+        # 検証・解析・出力はバックグラウンドタスクでまとめて行う）
+        self._queue = deque(maxlen=256)
+        self._drain_interval = 0.1  # 秒
+        self._drain_task = None
         
     def is_valid_co2_sensor(self, manufacturer_id: int, data: bytes) -> bool:
-        """CO2センサーとして有効なデバイスかチェック"""
-        if manufacturer_id != 76 or len(data) < 8:
-            return False
-        
-        device_type = data[0] & 0x7F
-        if device_type != 0x10:  # 実測でのCO2センサータイプ
-            return False
-        
-        # CO2値が現実的な範囲かチェック
-        byte5_val = data[5]
-        co2_calc = int(byte5_val * 7.67)
-        if not (300 <= co2_calc <= 5000):
-            return False
-        
-        # 温度が現実的な範囲かチェック
-        temp = data[3]
-        if not (0 <= temp <= 50):
-            return False
-        
-        return True
+        """CO2センサーとして有効なデバイスかチェック
+
+        CO2換算値と温度の範囲チェックは事前計算済みテーブルの参照で行う。
+        """
+        return (manufacturer_id == 76
+                and len(data) >= 8
+                and (data[0] & 0x7F) == 0x10  # 実測でのCO2センサータイプ
+                and _VALID_B5[data[5]] != 0   # CO2値が現実的な範囲か
+                and _VALID_B3[data[3]] != 0)  # 温度が現実的な範囲か
     
-    def should_update_device(self, device_address: str) -> bool:
-        """デバイスの更新が必要かチェック"""
-        now = datetime.now()
+    def should_update_device(self, device_address: str, now_ns: int = None) -> bool:
+        """デバイスの更新が必要かチェック
+
+        datetime.now()のシステムコール＋オブジェクト生成を避け、
+        monotonic_nsの整数比較のみで判定する。
+        """
+        if now_ns is None:
+            now_ns = time.monotonic_ns()
         last_update = self.device_cache.get(device_address)
-        
+
         if last_update is None:
             return True
-        
-        elapsed = (now - last_update).total_seconds()
-        return elapsed >= self.update_interval
+
+        return now_ns - last_update >= self._update_interval_ns
     
     def detection_callback(self, device: BLEDevice, advertisement_data: AdvertisementData):
-        """CO2センサーのみを検出するコールバック"""
+        """受信アドバタイズをキューへ積むだけの軽量コールバック
+
+        パケット毎の検証・解析・タスク生成はここでは行わず、
+        _drain_loop側で100ms毎にまとめて処理する。
+        """
+        # SwitchBot製造者ID(76)を持つパケットのみ積む（最小限の事前判定）
+        if 76 in advertisement_data.manufacturer_data:
+            self._queue.append((device, advertisement_data))
+
+    async def _drain_loop(self):
+        """キューのアドバタイズを一定間隔でまとめて処理するループ"""
         try:
-            if not hasattr(advertisement_data, 'manufacturer_data'):
-                return
-            
-            for manufacturer_id, data in advertisement_data.manufacturer_data.items():
-                if self.is_valid_co2_sensor(manufacturer_id, data):
-                    # 更新間隔チェック
-                    if not self.should_update_device(device.address):
-                        continue
-                    
-                    # CO2センサーとして記録
-                    self.co2_devices.add(device.address)
-                    self.device_cache[device.address] = datetime.now()
-                    
-                    # データ解析・表示
-                    sensor = SwitchBotCO2Sensor(device)
-                    co2_data = sensor.create_sensor_data_from_advertisement(advertisement_data)
-                    
-                    if co2_data:
-                        # データを出力
-                        asyncio.create_task(self.exporter.export(co2_data))
-                        logger.info(f"[CO2センサー] {device.address} - "
-                                   f"CO2: {co2_data.co2_ppm}ppm, "
-                                   f"温度: {co2_data.temperature}°C, "
-                                   f"湿度: {co2_data.humidity}%")
-                    break
+            while True:
+                await asyncio.sleep(self._drain_interval)
+                if not self._queue:
+                    continue
+
+                # アドレス毎に最新のアドバタイズだけ残す（重複排除）
+                latest = {}
+                while self._queue:
+                    device, advertisement_data = self._queue.popleft()
+                    latest[device.address] = (device, advertisement_data)
+
+                exports = []
+                for device, advertisement_data in latest.values():
+                    co2_data = self._process_advertisement(device, advertisement_data)
+                    if co2_data is not None:
+                        exports.append(self.exporter.export(co2_data))
+
+                # 出力はバッチ分を1回のgatherでまとめて実行
+                if exports:
+                    await asyncio.gather(*exports)
+        except asyncio.CancelledError:
+            pass
+
+    def _process_advertisement(self, device: BLEDevice, advertisement_data: AdvertisementData):
+        """1件のアドバタイズを検証・解析してCO2データを返す"""
+        try:
+            data = advertisement_data.manufacturer_data.get(76)
+            if data is None or not self.is_valid_co2_sensor(76, data):
+                return None
+
+            # 更新間隔チェック（時刻取得は1回だけ行い記録にも使い回す）
+            now_ns = time.monotonic_ns()
+            if not self.should_update_device(device.address, now_ns):
+                return None
+
+            # CO2センサーとして記録
+            self.co2_devices.add(device.address)
+            self.device_cache[device.address] = now_ns
+
+            # データ解析・表示
+            sensor = SwitchBotCO2Sensor(device)
+            co2_data = sensor.create_sensor_data_from_advertisement(advertisement_data)
+
+            if co2_data:
+                logger.info(f"[CO2センサー] {device.address} - "
+                           f"CO2: {co2_data.co2_ppm}ppm, "
+                           f"温度: {co2_data.temperature}°C, "
+                           f"湿度: {co2_data.humidity}%")
+            return co2_data
         except Exception as e:
             logger.error(f"検出エラー: {e}")
+            return None
     
     async def start_monitoring(self, duration: int = 300):
         """指定時間だけ監視（デフォルト5分）"""
@@ -101,7 +140,10 @@ class CO2SensorFilter:
         logger.info("Ctrl+C で終了")
         
         try:
-            scanner = BleakScanner(self.detection_callback)
+            self._drain_task = asyncio.create_task(self._drain_loop())
+            # SwitchBot製造者ID(76)のパケットのみOSレベルで通す
+            # （未対応バックエンドでは通常スキャンにフォールバック）
+            scanner = create_filtered_scanner(self.detection_callback, (76,))
             await scanner.start()
             await asyncio.sleep(duration)
             await scanner.stop()
@@ -110,6 +152,9 @@ class CO2SensorFilter:
         except Exception as e:
             logger.error(f"監視エラー: {e}")
         finally:
+            if self._drain_task is not None:
+                self._drain_task.cancel()
+                self._drain_task = None
             logger.info(f"監視終了 - 検出されたCO2センサー: {len(self.co2_devices)}台")
             for addr in self.co2_devices:
                 logger.info(f"  CO2センサー: {addr}")
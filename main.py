@@ -7,6 +7,14 @@ import asyncio
 import logging
 from datetime import datetime, timezone
 
+# C実装のイベントループuvloopがあれば採用する（APIは標準asyncioと同一。
+# HTTP送信・タイマー処理のスループットが向上する。未インストールでも動作）
+try:
+    import uvloop
+    uvloop.install()
+except ImportError:
+    pass
+
 # 新しいライブラリをインポート
 from co2logger import (
     DeviceScanner, 
@@ -91,21 +99,29 @@ async def main():
         print("\nデータ監視中... (Ctrl+Cで停止)")
         print("=" * 60)
         
-        # Step 8: 定期的にデータを要求
+        # Step 8: 通知でデータが届かない場合のみ定期的にデータを要求
         try:
             while True:
+                # 30秒待機
+                await asyncio.sleep(30)
+
+                # 通知で直近30秒以内にデータが届いていれば能動要求は不要
+                # （要求コマンドの書き込みと応答待ちのBLE往復を省く）
+                latest = co2_sensor.latest_data
+                if latest is not None:
+                    age = (datetime.now(timezone.utc) - latest.timestamp).total_seconds()
+                    if age < 30:
+                        continue
+
                 # 現在のデータを取得（新しいデータを要求）
                 current_data = await co2_sensor.get_current_data(request_new=True, timeout=10.0)
-                
+
                 if current_data:
                     # データが取得できた場合は何もしない（コールバックで処理済み）
                     pass
                 else:
                     print("データの取得に失敗またはタイムアウト")
                 
-                # 30秒待機
-                await asyncio.sleep(30)
-                
         except KeyboardInterrupt:
             print("\n\n監視を停止しています...")
             
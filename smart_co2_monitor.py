@@ -6,21 +6,40 @@ OUI（会社固有番号）ベースの高精度自動検出
 
 import asyncio
 import logging
+from collections import deque
 from datetime import datetime
-from typing import Dict, Set, Optional
-from bleak import BleakScanner
+from functools import lru_cache
+from typing import Dict, Set, Optional, Tuple
 from bleak.backends.device import BLEDevice
 from bleak.backends.scanner import AdvertisementData
 
 from co2logger.core.oui_detector import OUIBasedCO2Detector, OUIDatabase
 from co2logger.devices.real_co2_meter import RealCO2Meter
 from co2logger.devices.switchbot_co2 import SwitchBotCO2Sensor
-from co2logger import ConsoleExporter
+from co2logger import ConsoleExporter, create_filtered_scanner
 
 # ロギング設定
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+
+@lru_cache(maxsize=1024)
+def _resolve_oui(address: str) -> Tuple[str, Optional[Dict]]:
+    """アドレスからOUIとOUI情報をまとめて解決（結果をキャッシュ）
+
+    同一デバイスのアドバタイズは何度も届くため、アドレス毎の
+    文字列スライス＋dict参照を初回の1回だけにする。
+    """
+    return OUIDatabase.extract_oui(address), OUIDatabase.get_oui_info(address)
+
+
+# デバイスタイプの表示名（呼び出し毎のdictリテラル生成を避ける）
+_DEVICE_TYPE_LABELS = {
+    "real_co2_meter": "実際のCO2計",
+    "switchbot_co2": "SwitchBot CO2センサー",
+}
+
+
 class SmartCO2Monitor:
     """OUIベース高精度CO2デバイス監視"""
     
@@ -30,6 +49,19 @@ class SmartCO2Monitor:
         self.verified_co2_devices: Dict[str, str] = {}  # アドレス -> デバイスタイプ
         self.target_device: Optional[str] = None  # 監視対象デバイスアドレス
         self.discovery_timeout = 30  # 発見タイムアウトを短縮
+        # 受信アドバタイズのリングバッファ（コールバックは積むだけにして
+        # 検証・解析はバックグラウンドタスクでまとめて行う）
+        self._queue = deque(maxlen=256)
+        self._drain_interval = 0.1  # 秒
+        self._drain_task = None
+        # エクスポート用の有界キュー（fire-and-forgetのタスク生成をやめ、
+        # 1本のワーカーで逐次処理してバックプレッシャーを効かせる）
+        self._out_q: asyncio.Queue = asyncio.Queue(maxsize=64)
+        self._export_task = None
+        # アドレス毎のデバイスラッパー（パケット毎の再生成を避ける）
+        self._meters: Dict[str, RealCO2Meter] = {}
+        # アドレス毎の直近ペイロード（同一内容の再アドバタイズを解析前に排除）
+        self._last_payload: Dict[str, bytes] = {}
         
     def is_target_device(self, device_address: str) -> bool:
         """対象デバイスかチェック"""
@@ -37,29 +69,34 @@ class SmartCO2Monitor:
     
     def verify_co2_device(self, device: BLEDevice, advertisement_data: AdvertisementData) -> Optional[str]:
         """厳密なCO2デバイス検証"""
-        
+
+        # ステップ0: 製造者IDによる即時除外
+        # 監視対象は実CO2計（製造者ID 2409）のみなので、IDを持たない
+        # パケット（大多数）はdictメンバーシップ判定1回で弾く
+        md = advertisement_data.manufacturer_data if advertisement_data else None
+        if not md or 2409 not in md:
+            return None
+
         # ステップ1: OUIベース事前フィルタリング
         if not self.oui_detector.is_likely_co2_device(device, advertisement_data):
             return None
-        
-        oui_info = OUIDatabase.get_oui_info(device.address)
-        
+
+        oui, oui_info = _resolve_oui(device.address)
+
         # ステップ2: 実際のCO2計検証
         if RealCO2Meter.is_real_co2_meter(device, advertisement_data):
             # OUI確認
             if oui_info and "co2_meter" in oui_info.get("device_types", []):
                 # 追加検証: CO2値が現実的な範囲か
-                if hasattr(advertisement_data, 'manufacturer_data'):
-                    for manufacturer_id, data in advertisement_data.manufacturer_data.items():
-                        if manufacturer_id == 2409 and len(data) >= 16:
-                            try:
-                                import struct
-                                co2_ppm = struct.unpack('>H', data[13:15])[0]
-                                if 300 <= co2_ppm <= 5000:
-                                    logger.info(f"✅ 実際のCO2計を確認: {device.address} (OUI: {OUIDatabase.extract_oui(device.address)})")
-                                    return "real_co2_meter"
-                            except:
-                                pass
+                # （キーは2409と分かっているためitems()走査ではなく直接参照）
+                data = advertisement_data.manufacturer_data.get(2409)
+                if data is not None and len(data) >= 16:
+                    # 長さ検査済みのためインデックスは範囲外にならない
+                    # （単一u16(BE)はスライス+struct.unpackよりシフト演算が速い）
+                    co2_ppm = (data[13] << 8) | data[14]
+                    if 300 <= co2_ppm <= 5000:
+                        logger.info("✅ 実際のCO2計を確認: %s (OUI: %s)", device.address, oui)
+                        return "real_co2_meter"
         
         # ステップ3: SwitchBot CO2センサー検証 → 除外
         # 理由: SwitchBotは温湿度計、スイッチ、カーテンなど多様なデバイスがあり
@@ -74,69 +111,125 @@ class SmartCO2Monitor:
             co2_data = None
             
             if device_type == "real_co2_meter":
-                meter = RealCO2Meter(device)
+                meter = self._meters.get(device.address)
+                if meter is None:
+                    meter = self._meters[device.address] = RealCO2Meter(device)
                 co2_data = meter.create_sensor_data_from_advertisement(advertisement_data)
             # SwitchBotは除外（誤検出防止のため）
             
             if co2_data:
-                # データ出力（即座に表示）
-                asyncio.create_task(self.exporter.export(co2_data))
-                
-                # OUI情報付きログ
-                oui = OUIDatabase.extract_oui(device.address)
-                oui_info = OUIDatabase.get_oui_info(device.address)
-                company = oui_info.get("company", "Unknown") if oui_info else "Unknown"
+                # データ出力（有界キュー経由。満杯時は最古を捨てて最新を優先）
+                try:
+                    self._out_q.put_nowait(co2_data)
+                except asyncio.QueueFull:
+                    self._out_q.get_nowait()
+                    self._out_q.put_nowait(co2_data)
                 
                 # 対象デバイスのみ詳細ログを表示
-                if self.target_device and device.address == self.target_device:
-                    logger.info(f"[{company}] {device.address} (OUI: {oui})")
-                    logger.info(f"  CO2: {co2_data.co2_ppm} ppm")
-                    logger.info(f"  温度: {co2_data.temperature}°C")
-                    logger.info(f"  湿度: {co2_data.humidity}%")
+                # （INFO無効時はOUI解決も文字列整形も行わない）
+                if (self.target_device and device.address == self.target_device
+                        and logger.isEnabledFor(logging.INFO)):
+                    oui, oui_info = _resolve_oui(device.address)
+                    company = oui_info.get("company", "Unknown") if oui_info else "Unknown"
+                    logger.info("[%s] %s (OUI: %s)", company, device.address, oui)
+                    logger.info("  CO2: %s ppm", co2_data.co2_ppm)
+                    logger.info("  温度: %s°C", co2_data.temperature)
+                    logger.info("  湿度: %s%%", co2_data.humidity)
                 
         except Exception as e:
             logger.error(f"CO2データ処理エラー ({device.address}): {e}")
     
     def detection_callback(self, device: BLEDevice, advertisement_data: AdvertisementData):
-        """高精度検出コールバック"""
+        """受信アドバタイズをキューへ積むだけの軽量コールバック"""
+        # 対象デバイス決定後は他デバイスのアドバタイズを即座に除外
+        if self.target_device is not None and device.address != self.target_device:
+            return
+        self._queue.append((device, advertisement_data))
+
+    async def _drain_loop(self):
+        """キューのアドバタイズを一定間隔でまとめて処理するループ"""
         try:
+            while True:
+                await asyncio.sleep(self._drain_interval)
+                if not self._queue:
+                    continue
+
+                # アドレス毎に最新のアドバタイズだけ残す（重複排除）
+                latest = {}
+                while self._queue:
+                    device, advertisement_data = self._queue.popleft()
+                    latest[device.address] = (device, advertisement_data)
+
+                for device, advertisement_data in latest.values():
+                    self._handle_advertisement(device, advertisement_data)
+        except asyncio.CancelledError:
+            pass
+
+    async def _export_worker(self):
+        """キューに入ったCO2データを順次エクスポートするワーカー"""
+        try:
+            while True:
+                co2_data = await self._out_q.get()
+                try:
+                    await self.exporter.export(co2_data)
+                except Exception as e:
+                    logger.error(f"エクスポートエラー: {e}")
+        except asyncio.CancelledError:
+            pass
+
+    def _handle_advertisement(self, device: BLEDevice, advertisement_data: AdvertisementData):
+        """1件のアドバタイズを検証して対象デバイスの処理を行う"""
+        try:
+            address = device.address
+
+            # 検証済みデバイスはフルの検証パイプラインを通さず即処理
+            # （定常監視中はこの1回の辞書参照だけで分岐が決まる）
+            device_type = self.verified_co2_devices.get(address)
+            if device_type is not None:
+                if self.is_target_device(address):
+                    # ペイロードが前回と同一なら値も同じなので解析・出力を省く
+                    payload = advertisement_data.manufacturer_data.get(2409)
+                    if payload is not None:
+                        if self._last_payload.get(address) == payload:
+                            return
+                        self._last_payload[address] = bytes(payload)
+                    self.process_co2_data(device, advertisement_data, device_type)
+                return
+
             # OUIベース厳密検証
             device_type = self.verify_co2_device(device, advertisement_data)
-            
+
             if device_type:
-                # 新しいCO2デバイス発見
-                if device.address not in self.verified_co2_devices:
-                    self.verified_co2_devices[device.address] = device_type
-                    
-                    # 最初に見つかったデバイスを対象に設定
-                    if self.target_device is None:
-                        self.target_device = device.address
-                        
-                        oui = OUIDatabase.extract_oui(device.address)
-                        oui_info = OUIDatabase.get_oui_info(device.address)
-                        company = oui_info.get("company", "Unknown") if oui_info else "Unknown"
-                        confidence = OUIDatabase.get_confidence_level(device.address)
-                        
-                        device_type_name = {
-                            "real_co2_meter": "実際のCO2計"
-                        }.get(device_type, device_type)
-                        
-                        logger.info(f"🎯 対象CO2デバイス決定: {device_type_name}")
-                        logger.info(f"   アドレス: {device.address}")
-                        logger.info(f"   OUI: {oui} ({company})")
-                        logger.info(f"   信頼性: {confidence}")
-                        logger.info(f"   デバイス名: {device.name or '(名前なし)'}")
-                        logger.info(f"   以降このデバイスのみ監視します")
+                # 新しいCO2デバイス発見（既知アドレスは上で早期リターン済み）
+                self.verified_co2_devices[address] = device_type
+
+                # 最初に見つかったデバイスを対象に設定
+                if self.target_device is None:
+                    self.target_device = address
+
+                    oui, oui_info = _resolve_oui(address)
+                    company = oui_info.get("company", "Unknown") if oui_info else "Unknown"
+                    confidence = oui_info.get("confidence", "unknown") if oui_info else "unknown"
+
+                    device_type_name = _DEVICE_TYPE_LABELS.get(device_type, device_type)
+
+                    logger.info(f"🎯 対象CO2デバイス決定: {device_type_name}")
+                    logger.info(f"   アドレス: {device.address}")
+                    logger.info(f"   OUI: {oui} ({company})")
+                    logger.info(f"   信頼性: {confidence}")
+                    logger.info(f"   デバイス名: {device.name or '(名前なし)'}")
+                    logger.info(f"   以降このデバイスのみ監視します")
                 
                 # 対象デバイスのデータを即座に処理
-                if self.is_target_device(device.address):
+                if self.is_target_device(address):
                     self.process_co2_data(device, advertisement_data, device_type)
             else:
                 # 監視対象が決定していない場合のみ未知OUIを調査
-                if self.target_device is None:
+                # （結果はDEBUGログにしか使わないため、DEBUG無効時は調査自体を省く）
+                if self.target_device is None and logger.isEnabledFor(logging.DEBUG):
                     suggestion = self.oui_detector.suggest_new_oui(device, advertisement_data)
                     if suggestion:
-                        logger.debug(f"🔍 新しいCO2デバイス候補: {suggestion['oui']} ({device.address})")
+                        logger.debug("🔍 新しいCO2デバイス候補: %s (%s)", suggestion['oui'], device.address)
                     
         except Exception as e:
             logger.error(f"検出コールバックエラー: {e}")
@@ -148,21 +241,25 @@ class SmartCO2Monitor:
         logger.info(f"発見タイムアウト: {self.discovery_timeout}秒")
         logger.info("最初に見つかったOUI一致デバイスを監視対象に設定します")
         
-        scanner = BleakScanner(self.detection_callback)
+        self._drain_task = asyncio.create_task(self._drain_loop())
+        self._export_task = asyncio.create_task(self._export_worker())
+        # 実CO2計の製造者ID(2409)のパケットのみOSレベルで通す
+        # （未対応バックエンドでは通常スキャンにフォールバック）
+        scanner = create_filtered_scanner(self.detection_callback, (2409,))
         await scanner.start()
         await asyncio.sleep(self.discovery_timeout)
         await scanner.stop()
-        
+        self._drain_task.cancel()
+        self._drain_task = None
+        self._export_task.cancel()
+        self._export_task = None
+
         if self.target_device:
             device_type = self.verified_co2_devices[self.target_device]
-            oui = OUIDatabase.extract_oui(self.target_device)
-            oui_info = OUIDatabase.get_oui_info(self.target_device)
+            oui, oui_info = _resolve_oui(self.target_device)
             company = oui_info.get("company", "Unknown") if oui_info else "Unknown"
             
-            device_type_name = {
-                "real_co2_meter": "実際のCO2計",
-                "switchbot_co2": "SwitchBot CO2センサー"
-            }.get(device_type, device_type)
+            device_type_name = _DEVICE_TYPE_LABELS.get(device_type, device_type)
             
             logger.info(f"✅ 監視対象CO2デバイス決定:")
             logger.info(f"  📍 {self.target_device} - {device_type_name} ({company}, OUI: {oui})")
@@ -189,7 +286,9 @@ class SmartCO2Monitor:
         logger.info("Ctrl+C で終了")
         
         try:
-            scanner = BleakScanner(self.detection_callback)
+            self._drain_task = asyncio.create_task(self._drain_loop())
+            self._export_task = asyncio.create_task(self._export_worker())
+            scanner = create_filtered_scanner(self.detection_callback, (2409,))
             await scanner.start()
             await asyncio.sleep(duration)
             await scanner.stop()
@@ -198,6 +297,12 @@ class SmartCO2Monitor:
         except Exception as e:
             logger.error(f"監視エラー: {e}")
         finally:
+            if self._drain_task is not None:
+                self._drain_task.cancel()
+                self._drain_task = None
+            if self._export_task is not None:
+                self._export_task.cancel()
+                self._export_task = None
             logger.info("監視終了")
     
     async def start_smart_monitoring(self, monitoring_duration: int = 300):
@@ -0,0 +1,23 @@
+"""
+テスト共通のフィクスチャとスタンドイン
+
+属性を読むだけのテストではMagicMockの__getattr__ディスパッチが
+不要なオーバーヘッドになるため、軽量なdataclassの代役を使う。
+呼び出しの検証が必要なテストでは引き続きMock/MagicMockを使うこと。
+"""
+from dataclasses import dataclass, field
+from typing import Dict
+
+
+@dataclass(slots=True)
+class FakeBLEDevice:
+    """BLEDeviceの代役（name/addressの属性読み取りのみ対応）"""
+    name: str
+    address: str
+
+
+@dataclass(slots=True)
+class FakeAdvertisementData:
+    """AdvertisementDataの代役（service_data/manufacturer_dataのみ対応）"""
+    service_data: Dict = field(default_factory=dict)
+    manufacturer_data: Dict = field(default_factory=dict)
@@ -2,25 +2,30 @@
 Tests for Bluetooth device base classes
 """
 import pytest
-from unittest.mock import AsyncMock, MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, Mock, patch
 from datetime import datetime, timezone
 from bleak.backends.device import BLEDevice
 from bleak.backends.scanner import AdvertisementData
 
-from co2logger.core.bluetooth_device import BluetoothDeviceBase, DeviceScanner
+from bleak import BleakError
+
+from co2logger.core.bluetooth_device import (
+    BluetoothDeviceBase,
+    DeviceScanner,
+    _PassiveFallbackScanner,
+)
 from co2logger.models.sensor_data import CO2SensorData
+from tests.conftest import FakeAdvertisementData, FakeBLEDevice
 
 
 class TestBluetoothDeviceBase:
     """Test cases for BluetoothDeviceBase"""
-    
-    @pytest.fixture
+
+    @pytest.fixture(scope="module")
     def mock_ble_device(self):
-        """Create a mock BLE device"""
-        device = MagicMock(spec=BLEDevice)
-        device.name = "SwitchBot Meter Pro CO2"
-        device.address = "AA:BB:CC:DD:EE:FF"
-        return device
+        """Create a mock BLE device (immutable, shared per module)"""
+        return FakeBLEDevice(name="SwitchBot Meter Pro CO2",
+                             address="AA:BB:CC:DD:EE:FF")
     
     @pytest.fixture
     def bluetooth_device(self, mock_ble_device):
@@ -150,27 +155,23 @@ class TestDeviceScanner:
         """Create a DeviceScanner instance"""
         return DeviceScanner()
     
-    @pytest.fixture
+    @pytest.fixture(scope="module")
     def mock_ble_device(self):
-        """Create a mock BLE device"""
-        device = MagicMock(spec=BLEDevice)
-        device.name = "SwitchBot Meter Pro CO2"
-        device.address = "AA:BB:CC:DD:EE:FF"
-        return device
-    
-    @pytest.fixture
+        """Create a mock BLE device (immutable, shared per module)"""
+        return FakeBLEDevice(name="SwitchBot Meter Pro CO2",
+                             address="AA:BB:CC:DD:EE:FF")
+
+    @pytest.fixture(scope="module")
     def mock_advertisement_data(self):
-        """Create mock advertisement data"""
-        ad_data = MagicMock(spec=AdvertisementData)
-        ad_data.service_data = {
+        """Create mock advertisement data (immutable, shared per module)"""
+        return FakeAdvertisementData(service_data={
             "fee7": b'\x7b\x01\x02\x03\x04'  # 0x7b = 123 (CO2 sensor type)
-        }
-        return ad_data
+        })
     
     @pytest.mark.asyncio
     async def test_scan_for_devices(self, scanner):
         """Test device scanning"""
-        mock_device = MagicMock(spec=BLEDevice)
+        mock_device = Mock()
         mock_device.name = "SwitchBot Device"
         mock_device.address = "AA:BB:CC:DD:EE:FF"
         
@@ -185,7 +186,7 @@ class TestDeviceScanner:
     
     def test_is_switchbot_device_by_name(self, scanner):
         """Test SwitchBot device identification by name"""
-        device = MagicMock(spec=BLEDevice)
+        device = Mock()
         device.name = "SwitchBot Meter Pro CO2"
         
         assert scanner.is_switchbot_device(device, None) is True
@@ -198,7 +199,7 @@ class TestDeviceScanner:
     
     def test_is_switchbot_device_by_service_data(self, scanner):
         """Test SwitchBot device identification by service data"""
-        device = MagicMock(spec=BLEDevice)
+        device = Mock()
         device.name = "Unknown Device"
         
         # Create proper mock advertisement data
@@ -218,11 +219,11 @@ class TestDeviceScanner:
     @pytest.mark.asyncio
     async def test_scan_for_switchbot_devices(self, scanner):
         """Test scanning specifically for SwitchBot devices"""
-        switchbot_device = MagicMock(spec=BLEDevice)
+        switchbot_device = Mock()
         switchbot_device.name = "SwitchBot Device"
         switchbot_device.address = "AA:BB:CC:DD:EE:FF"
         
-        other_device = MagicMock(spec=BLEDevice)
+        other_device = Mock()
         other_device.name = "Other Device"
         other_device.address = "11:22:33:44:55:66"
         
@@ -237,23 +238,26 @@ class TestDeviceScanner:
     def test_detection_callback(self, scanner):
         """Test detection callback functionality"""
         detected_devices = []
-        
-        def callback(device, ad_data):
-            detected_devices.append((device, ad_data))
-        
+
+        def callback(batch):
+            detected_devices.extend(batch)
+
         scanner.set_detection_callback(callback)
-        
+
         # Create mock SwitchBot device
-        mock_device = MagicMock(spec=BLEDevice)
+        mock_device = Mock()
         mock_device.name = "SwitchBot Device"
-        
+
         mock_ad_data = MagicMock()
         mock_ad_data.service_data = {"fee7": b'\x7b\x01\x02\x03\x04'}
-        
-        # Test detection callback is called for SwitchBot devices
+
+        # Test detection callback buffers SwitchBot devices
         result = scanner._detection_callback(mock_device, mock_ad_data)
-        
+
         assert result is True
+
+        # User callback receives the batch on flush
+        scanner._drain_pending()
         assert len(detected_devices) == 1
         assert detected_devices[0] == (mock_device, mock_ad_data)
     
@@ -268,4 +272,48 @@ class TestDeviceScanner:
         co2_devices = scanner.filter_devices_by_type(devices, 0x7b)
         
         assert len(co2_devices) == 1
-        assert co2_devices[0][1]["device_type"] == 0x7b
\ No newline at end of file
+        assert co2_devices[0][1]["device_type"] == 0x7b
+
+class TestPassiveFallbackScanner:
+    """パッシブスキャン失敗時のフォールバックラッパーのテストケース"""
+
+    @pytest.mark.asyncio
+    async def test_passive_start_success(self):
+        """パッシブスキャンがそのまま開始できる場合をテスト"""
+        passive = Mock()
+        passive.start = AsyncMock()
+        passive.stop = AsyncMock()
+
+        wrapper = _PassiveFallbackScanner(passive, Mock())
+
+        await wrapper.start()
+        passive.start.assert_awaited_once()
+
+        await wrapper.stop()
+        passive.stop.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_falls_back_to_active_scan_on_start_error(self):
+        """start()時のBleakErrorで通常スキャンに切り替わることをテスト"""
+        callback = Mock()
+        passive = Mock()
+        # --experimental無しのBlueZではRegisterMonitorがstart()時に失敗する
+        passive.start = AsyncMock(side_effect=BleakError("org.bluez.Error.NotPermitted"))
+
+        fallback = Mock()
+        fallback.start = AsyncMock()
+        fallback.stop = AsyncMock()
+
+        wrapper = _PassiveFallbackScanner(passive, callback)
+
+        with patch("co2logger.core.bluetooth_device.BleakScanner",
+                   return_value=fallback) as mock_scanner_cls:
+            await wrapper.start()
+
+        # 同じ検出コールバックで通常スキャナが作り直され、開始されている
+        mock_scanner_cls.assert_called_once_with(callback)
+        fallback.start.assert_awaited_once()
+
+        # 以降のstop()はフォールバック側に届く
+        await wrapper.stop()
+        fallback.stop.assert_awaited_once()
@@ -2,25 +2,28 @@
 SwitchBot CO2センサー専用クラスのテスト
 """
 import pytest
-from unittest.mock import AsyncMock, MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, Mock, patch
 from datetime import datetime, timezone
 from bleak.backends.device import BLEDevice
 from bleak.backends.scanner import AdvertisementData
 
 from co2logger.devices.switchbot_co2 import SwitchBotCO2Sensor
 from co2logger.models.sensor_data import CO2SensorData
+from tests.conftest import FakeBLEDevice
+
+# 共通のテストフレーム（CO2=400(0x0190), temp=28, humidity=60）
+_VALID_FRAME = b'\x57\x0b\x90\x50\x90\x01\x1c\x3c\x01\x02'  # 特性データ
+_ADV_VALID = b'\x7b\x50\x90\x01\x1c\x3c\x00'  # サービスデータ（リトルエンディアン）
 
 
 class TestSwitchBotCO2Sensor:
     """SwitchBot CO2センサークラスのテストケース"""
-    
-    @pytest.fixture
+
+    @pytest.fixture(scope="module")
     def mock_ble_device(self):
-        """モックBLEデバイスを作成"""
-        device = MagicMock(spec=BLEDevice)
-        device.name = "SwitchBot Meter Pro CO2"
-        device.address = "AA:BB:CC:DD:EE:FF"
-        return device
+        """モックBLEデバイスを作成（不変なのでモジュール内で共有）"""
+        return FakeBLEDevice(name="SwitchBot Meter Pro CO2",
+                             address="AA:BB:CC:DD:EE:FF")
     
     @pytest.fixture
     def co2_sensor(self, mock_ble_device):
@@ -42,7 +45,7 @@ class TestSwitchBotCO2Sensor:
     
     def test_is_co2_sensor_class_method_valid_device(self):
         """有効なCO2センサーデバイスの判定をテスト"""
-        device = MagicMock(spec=BLEDevice)
+        device = Mock()
         device.name = "SwitchBot Meter Pro CO2"
         
         mock_ad_data = MagicMock()
@@ -52,7 +55,7 @@ class TestSwitchBotCO2Sensor:
     
     def test_is_co2_sensor_class_method_invalid_device(self):
         """無効なデバイスの判定をテスト"""
-        device = MagicMock(spec=BLEDevice)
+        device = Mock()
         device.name = "Other Device"
         
         mock_ad_data = MagicMock()
@@ -62,7 +65,7 @@ class TestSwitchBotCO2Sensor:
     
     def test_is_co2_sensor_by_name_only(self):
         """デバイス名のみでのCO2センサー判定をテスト"""
-        device = MagicMock(spec=BLEDevice)
+        device = Mock()
         device.name = "SwitchBot Meter Pro CO2"
         
         assert SwitchBotCO2Sensor.is_co2_sensor(device, None) is True
@@ -71,9 +74,7 @@ class TestSwitchBotCO2Sensor:
         """有効なアドバタイズメントデータの解析をテスト"""
         ad_data = MagicMock()
         # CO2=400ppm (0x0190), temp=28℃, humidity=60%, device_type=0x7B
-        ad_data.service_data = {
-            "fee7": b'\x7b\x50\x90\x01\x1c\x3c\x00'  # リトルエンディアン: 0x0190 = 400
-        }
+        ad_data.service_data = {"fee7": _ADV_VALID}
         
         result = co2_sensor.parse_advertisement_data(ad_data)
         
@@ -97,9 +98,7 @@ class TestSwitchBotCO2Sensor:
         """有効な特性データの解析をテスト"""
         # SwitchBotのCO2センサー応答データ
         # header[2] + status + battery + co2_ppm(little endian) + temp + humidity + reserved[2]
-        char_data = b'\x57\x0b\x90\x50\x90\x01\x1c\x3c\x01\x02'  # CO2=400(0x0190), temp=28, humidity=60
-        
-        result = co2_sensor.parse_characteristic_data(char_data)
+        result = co2_sensor.parse_characteristic_data(_VALID_FRAME)
         
         assert isinstance(result, CO2SensorData)
         assert result.co2_ppm == 400
@@ -156,9 +155,7 @@ class TestSwitchBotCO2Sensor:
         co2_sensor.set_data_callback(callback)
         
         # 有効なCO2センサーデータ
-        data = b'\x57\x0b\x90\x50\x90\x01\x1c\x3c\x01\x02'  # CO2=400, temp=28, humidity=60
-        
-        co2_sensor._notification_handler(None, data)
+        co2_sensor._notification_handler(None, _VALID_FRAME)
         
         # latest_dataが更新されたことを確認
         assert co2_sensor.latest_data is not None
@@ -219,36 +216,23 @@ class TestSwitchBotCO2Sensor:
         """データ要求付きの現在データ取得をテスト"""
         mock_client = AsyncMock()
         mock_client.is_connected = True
-        mock_client.write_gatt_char = AsyncMock()
+        # 要求コマンド書き込みに応答して通知が届く状況をシミュレート
+        mock_client.write_gatt_char = AsyncMock(
+            side_effect=lambda *args, **kwargs: co2_sensor._notification_handler(None, _VALID_FRAME)
+        )
         co2_sensor.client = mock_client
-        
+
         # データが返される前の状態をシミュレート
         co2_sensor.latest_data = None
-        
-        with patch('asyncio.sleep') as mock_sleep:
-            # データ要求後にデータが設定されるようにシミュレート
-            async def side_effect(*args):
-                if not co2_sensor.latest_data:
-                    # 最初のsleep後にデータを設定
-                    test_data = CO2SensorData(
-                        timestamp=datetime.now(timezone.utc),
-                        co2_ppm=400,
-                        temperature=25.0,
-                        humidity=60.0,
-                        device_address="AA:BB:CC:DD:EE:FF"
-                    )
-                    co2_sensor.latest_data = test_data
-            
-            mock_sleep.side_effect = side_effect
-            
-            result = await co2_sensor.get_current_data(request_new=True, timeout=2.0)
-            
-            assert result is not None
-            assert result.co2_ppm == 400
-            
-            # データ要求が送信されたことを確認
-            mock_client.write_gatt_char.assert_called()
-    
+
+        result = await co2_sensor.get_current_data(request_new=True, timeout=2.0)
+
+        assert result is not None
+        assert result.co2_ppm == 400
+
+        # データ要求が送信されたことを確認
+        mock_client.write_gatt_char.assert_called()
+
     @pytest.mark.asyncio
     async def test_get_current_data_timeout(self, co2_sensor):
         """データ取得のタイムアウトをテスト"""
@@ -256,14 +240,13 @@ class TestSwitchBotCO2Sensor:
         mock_client.is_connected = True
         mock_client.write_gatt_char = AsyncMock()
         co2_sensor.client = mock_client
-        
-        # データが設定されない状態
+
+        # データが設定されない状態（通知が届かないままタイムアウト）
         co2_sensor.latest_data = None
-        
-        with patch('asyncio.sleep'):
-            result = await co2_sensor.get_current_data(request_new=True, timeout=0.1)
-            
-            assert result is None
+
+        result = await co2_sensor.get_current_data(request_new=True, timeout=0.1)
+
+        assert result is None
     
     def test_get_device_info(self, co2_sensor):
         """デバイス情報取得をテスト"""
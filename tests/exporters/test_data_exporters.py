@@ -2,10 +2,9 @@
 データエクスポーター機能のテスト
 """
 import pytest
-from unittest.mock import AsyncMock, MagicMock, patch, mock_open
+from unittest.mock import patch
 from datetime import datetime, timezone
 import json
-import io
 
 from co2logger.exporters.base import DataExporterBase
 from co2logger.exporters.console import ConsoleExporter
@@ -14,6 +13,27 @@ from co2logger.exporters.http_sender import HttpSender
 from co2logger.models.sensor_data import CO2SensorData
 
 
+class _StubResponse:
+    """aiohttpレスポンスの軽量スタブ
+
+    AsyncMockの動的な属性生成・呼び出し記録を避け、
+    非同期コンテキストマネージャーとして必要な最小限だけを実装する。
+    """
+
+    def __init__(self, status: int, body: str = ""):
+        self.status = status
+        self._body = body
+
+    async def text(self) -> str:
+        return self._body
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc) -> bool:
+        return False
+
+
 class TestDataExporterBase:
     """データエクスポーター基底クラスのテストケース"""
     
@@ -107,9 +127,9 @@ class TestJsonFileExporter:
     """JSONファイルエクスポーターのテストケース"""
     
     @pytest.fixture
-    def json_exporter(self):
+    def json_exporter(self, tmp_path):
         """JSONファイルエクスポーターインスタンスを作成"""
-        return JsonFileExporter("/tmp/test_co2_data.json")
+        return JsonFileExporter(str(tmp_path / "test_co2_data.json"))
     
     @pytest.fixture
     def sample_co2_data(self):
@@ -136,59 +156,42 @@ class TestJsonFileExporter:
     @pytest.mark.asyncio
     async def test_export_single_data_new_file(self, json_exporter, sample_co2_data):
         """新ファイルへの単一データエクスポートをテスト"""
-        mock_file = mock_open()
-        
-        with patch("builtins.open", mock_file):
-            with patch("os.path.exists", return_value=False):
-                await json_exporter.export(sample_co2_data)
-        
-        mock_file.assert_called_once_with("/tmp/test_co2_data.json", "w", encoding="utf-8")
-        written_data = "".join(call.args[0] for call in mock_file().write.call_args_list)
-        
-        # JSON形式で書き込まれたことを確認
-        parsed_data = json.loads(written_data)
+        await json_exporter.export(sample_co2_data)
+
+        # JSON形式で書き込まれたことを確認（実ファイルを読み戻す）
+        with open(json_exporter.file_path, encoding="utf-8") as f:
+            parsed_data = json.load(f)
         assert len(parsed_data) == 1
         assert parsed_data[0]["co2_ppm"] == 420
         assert parsed_data[0]["temperature"] == 25.5
-    
+
     @pytest.mark.asyncio
-    async def test_export_append_to_existing_file(self, sample_co2_data):
-        """既存ファイルへの追記をテスト"""
-        exporter = JsonFileExporter("/tmp/test.json", append_mode=True)
-        
-        # 既存データをモック
-        existing_data = [{"co2_ppm": 400, "temperature": 24.0}]
-        mock_file_content = json.dumps(existing_data)
-        
-        mock_file = mock_open(read_data=mock_file_content)
-        
-        with patch("builtins.open", mock_file):
-            with patch("os.path.exists", return_value=True):
-                await exporter.export(sample_co2_data)
-        
-        # ファイルが読み込まれて書き込まれたことを確認
-        assert mock_file().read.called
-        
-        written_data = "".join(call.args[0] for call in mock_file().write.call_args_list)
-        parsed_data = json.loads(written_data)
-        
-        # 既存データに新データが追加されたことを確認
-        assert len(parsed_data) == 2
-        assert parsed_data[1]["co2_ppm"] == 420
-    
+    async def test_export_append_to_existing_file(self, tmp_path, sample_co2_data):
+        """既存ファイルへの追記をテスト（NDJSON形式で1行追記）"""
+        file_path = tmp_path / "test.json"
+        # 既存の1レコードを事前に用意
+        file_path.write_text('{"co2_ppm": 999}\n', encoding="utf-8")
+
+        exporter = JsonFileExporter(str(file_path), append_mode=True)
+        await exporter.export(sample_co2_data)
+
+        lines = [line for line in file_path.read_text(encoding="utf-8").splitlines() if line]
+
+        # 既存行を保ったまま1レコードが1行のJSONとして追記されたことを確認
+        assert len(lines) == 2
+        assert json.loads(lines[0])["co2_ppm"] == 999
+        assert json.loads(lines[1])["co2_ppm"] == 420
+
     @pytest.mark.asyncio
     async def test_export_multiple_data(self, json_exporter, sample_co2_data):
         """複数データのエクスポートをテスト"""
         data_list = [sample_co2_data, sample_co2_data]
-        mock_file = mock_open()
-        
-        with patch("builtins.open", mock_file):
-            with patch("os.path.exists", return_value=False):
-                await json_exporter.export(data_list)
-        
-        written_data = "".join(call.args[0] for call in mock_file().write.call_args_list)
-        parsed_data = json.loads(written_data)
-        
+
+        await json_exporter.export(data_list)
+
+        with open(json_exporter.file_path, encoding="utf-8") as f:
+            parsed_data = json.load(f)
+
         assert len(parsed_data) == 2
     
     @pytest.mark.asyncio
@@ -241,11 +244,9 @@ class TestHttpSender:
     @pytest.mark.asyncio
     async def test_export_single_data_success(self, http_sender, sample_co2_data):
         """単一データの送信成功をテスト"""
-        # レスポンスモックをコンテキストマネージャーとして設定
-        mock_response = AsyncMock()
-        mock_response.__aenter__.return_value.status = 200
-        mock_response.__aenter__.return_value.text = AsyncMock(return_value="OK")
-        
+        # レスポンススタブをコンテキストマネージャーとして設定
+        mock_response = _StubResponse(200, "OK")
+
         with patch("aiohttp.ClientSession.post", return_value=mock_response) as mock_post:
             result = await http_sender.export(sample_co2_data)
             
@@ -256,14 +257,15 @@ class TestHttpSender:
             call_args = mock_post.call_args
             sent_data = json.loads(call_args.kwargs["data"])
             assert sent_data["co2_ppm"] == 420
-    
+
+        await http_sender.close()
+
     @pytest.mark.asyncio
     async def test_export_multiple_data_success(self, http_sender, sample_co2_data):
         """複数データの送信成功をテスト"""
         data_list = [sample_co2_data, sample_co2_data]
-        mock_response = AsyncMock()
-        mock_response.__aenter__.return_value.status = 200
-        
+        mock_response = _StubResponse(200)
+
         with patch("aiohttp.ClientSession.post", return_value=mock_response) as mock_post:
             result = await http_sender.export(data_list)
             
@@ -273,46 +275,42 @@ class TestHttpSender:
             call_args = mock_post.call_args
             sent_data = json.loads(call_args.kwargs["data"])
             assert len(sent_data) == 2
-    
+
+        await http_sender.close()
+
     @pytest.mark.asyncio
     async def test_export_http_error(self, http_sender, sample_co2_data):
         """HTTP送信エラーをテスト"""
-        mock_response = AsyncMock()
-        mock_response.__aenter__.return_value.status = 500
-        mock_response.__aenter__.return_value.text = AsyncMock(return_value="Internal Server Error")
-        
+        mock_response = _StubResponse(500, "Internal Server Error")
+
         with patch("aiohttp.ClientSession.post", return_value=mock_response):
             result = await http_sender.export(sample_co2_data)
-            
+
             assert result is False
-    
+
+        await http_sender.close()
+
     @pytest.mark.asyncio
     async def test_export_connection_error(self, http_sender, sample_co2_data):
         """接続エラーをテスト"""
         with patch("aiohttp.ClientSession.post", side_effect=Exception("接続エラー")):
             result = await http_sender.export(sample_co2_data)
-            
+
             assert result is False
-    
+
+        await http_sender.close()
+
     @pytest.mark.asyncio
     async def test_export_with_retry(self, sample_co2_data):
         """リトライ機能をテスト"""
         sender = HttpSender("http://example.com", max_retries=3)
         
         # 最初の2回は失敗、3回目は成功
-        mock_response1 = AsyncMock()
-        mock_response1.__aenter__.return_value.status = 500
-        mock_response1.__aenter__.return_value.text = AsyncMock(return_value="Error")
-        
-        mock_response2 = AsyncMock()
-        mock_response2.__aenter__.return_value.status = 500
-        mock_response2.__aenter__.return_value.text = AsyncMock(return_value="Error")
-        
-        mock_response3 = AsyncMock()
-        mock_response3.__aenter__.return_value.status = 200
-        mock_response3.__aenter__.return_value.text = AsyncMock(return_value="OK")
-        
-        mock_responses = [mock_response1, mock_response2, mock_response3]
+        mock_responses = [
+            _StubResponse(500, "Error"),
+            _StubResponse(500, "Error"),
+            _StubResponse(200, "OK"),
+        ]
         
         with patch("aiohttp.ClientSession.post", side_effect=mock_responses) as mock_post:
             with patch("asyncio.sleep"):  # リトライ待機をスキップ
@@ -320,19 +318,36 @@ class TestHttpSender:
                 
                 assert result is True
                 assert mock_post.call_count == 3
-    
+
+        await sender.close()
+
+    @pytest.mark.asyncio
+    async def test_export_client_error_not_retried(self, sample_co2_data):
+        """リトライ対象外の4xxエラーは即時に諦めることをテスト"""
+        sender = HttpSender("http://example.com", max_retries=3)
+
+        mock_response = _StubResponse(400, "Bad Request")
+
+        with patch("aiohttp.ClientSession.post", return_value=mock_response) as mock_post:
+            result = await sender.export(sample_co2_data)
+
+            assert result is False
+            assert mock_post.call_count == 1  # 再送しても結果は変わらない
+
+        await sender.close()
+
     @pytest.mark.asyncio
     async def test_export_max_retries_exceeded(self, sample_co2_data):
         """最大リトライ数超過をテスト"""
         sender = HttpSender("http://example.com", max_retries=2)
         
-        mock_response = AsyncMock()
-        mock_response.__aenter__.return_value.status = 500
-        mock_response.__aenter__.return_value.text = AsyncMock(return_value="Error")
-        
+        mock_response = _StubResponse(500, "Error")
+
         with patch("aiohttp.ClientSession.post", return_value=mock_response) as mock_post:
             with patch("asyncio.sleep"):
                 result = await sender.export(sample_co2_data)
                 
                 assert result is False
-                assert mock_post.call_count == 3  # 初回 + 2回のリトライ
\ No newline at end of file
+                assert mock_post.call_count == 3  # 初回 + 2回のリトライ
+
+        await sender.close()
\ No newline at end of file